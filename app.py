@@ -1,10 +1,15 @@
-import streamlit as st
-import re
-from gtts import gTTS
-import io
+import atexit
+import json
+import mimetypes
 import os
-from moviepy.editor import *
-import math
+import shutil
+import streamlit as st
+import time
+import metrics
+from jobs import DONE, FAILED, QUEUED, JobQueue
+from text_processing import LANGUAGES, parse_text_to_scenes
+# The video stack (pipeline, render and their NumPy, Pillow and ffmpeg
+# dependencies) is imported only on the Create page; see get_render_pool.
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -13,52 +18,199 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- Language Dictionary ---
-LANGUAGES = {
-    "English": "en",
-    "Hindi (हिन्दी)": "hi",
-    "Bengali (বাংলা)": "bn",
-    "Tamil (தமிழ்)": "ta",
-    "Telugu (తెలుగు)": "te",
-    "Kannada (ಕನ್ನಡ)": "kn",
-    "Gujarati (ગુજરાતી)": "gu",
-    "Marathi ( मराठी)": "mr",
-    "Malayalam (മലയാളം)": "ml",
-    "Punjabi (ਪੰਜਾਬੀ)": "pa",
-    "Urdu (اردو)": "ur",
-    "Odia (ଓଡ଼IA)": "or",
+POLL_INTERVAL = 0.5 # Seconds between render job progress checks
+
+# Job workspaces live under static/, which Streamlit serves at app/static/ when
+# server.enableStaticServing is on (see .streamlit/config.toml). Videos then play
+# and download straight from disk instead of being copied into every session.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+JOBS_DIR = os.path.join(STATIC_DIR, "jobs")
+# Streamlit answers 404 for static files over 200 MB (long full-quality
+# renders), so those are played and downloaded through the session instead.
+MAX_STATIC_FILE_BYTES = 200 * 1024 * 1024
+# Some systems' mime.types claim .ts for Qt translation files; HLS players need MPEG-TS.
+mimetypes.add_type("video/mp2t", ".ts")
+
+# Plays an MP4, or an HLS playlist that is still growing (with hls.js, or natively on Safari).
+PLAYER_HEIGHT = 400
+PLAYER_HTML = """
+<video id="player" controls playsinline style="width:100%%;height:380px;background:#000"></video>
+<script src="https://cdn.jsdelivr.net/npm/hls.js@1"></script>
+<script>
+const video = document.getElementById("player");
+const src = %(src)s;
+if (src.endsWith(".m3u8") && window.Hls && Hls.isSupported()) {
+  const hls = new Hls({startPosition: 0});
+  hls.loadSource(src);
+  hls.attachMedia(video);
+} else {
+  video.src = src;
+}
+</script>
+"""
+
+# Camera motion choices shown in the UI, mapped to render.CAMERAS
+CAMERA_OPTIONS = {
+    "Ken Burns (mixed zooms and pans)": "ken_burns",
+    "Slow Zoom In": "zoom_in",
+    "Slow Zoom Out": "zoom_out",
+    "Pan Left": "pan_left",
+    "Pan Right": "pan_right",
+    "Static Close-Up": "static",
 }
 
 # --- Helper Functions ---
-def parse_text_to_sentences(text):
-    """Splits text into sentences."""
-    text = re.sub(r'(\.+|!|\?)(\s|(?=[\r\n]{2,}))', r'\1|', text)
-    text = re.sub(r'(\r\n|\n){2,}', '|', text)
-    sentences = text.split('|')
-    return [s.strip() for s in sentences if s.strip()]
-
-def cleanup_files(paths):
-    """Removes temporary files."""
-    for path in paths:
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-            except Exception as e:
-                st.warning(f"Could not delete temp file: {path} ({e})")
-
-def save_uploaded_files(uploaded_files):
-    """Saves uploaded files to temp paths and returns the paths."""
-    temp_paths = []
-    for i, file in enumerate(uploaded_files):
-        # Use a consistent naming convention
-        path = f"temp_upload_{i}.jpg" 
-        try:
-            with open(path, "wb") as f:
-                f.write(file.getbuffer())
-            temp_paths.append(path)
-        except Exception as e:
-            st.error(f"Error saving uploaded file: {e}")
-    return temp_paths
+@st.cache_resource
+def get_job_queue():
+    """Returns the render job queue shared by every session in this process."""
+    # Streamlit turns static serving off at startup, before this runs, if
+    # static/ is over 1 GB. So workspaces are deleted when the process exits,
+    # and again here in case a previous process crashed.
+    shutil.rmtree(JOBS_DIR, ignore_errors=True)
+    atexit.register(shutil.rmtree, JOBS_DIR, ignore_errors=True)
+    return JobQueue(root=JOBS_DIR)
+
+@st.cache_resource(show_spinner="Starting the video engine...")
+def get_render_pool():
+    """Loads and warms up the video stack once per process.
+
+    Returns the pool of render worker processes shared by every session,
+    or None on a single core, where scenes render on the job's own thread.
+    """
+    from pipeline import warm_up
+    from render import RENDER_WORKERS, start_render_pool
+    warm_up(LANGUAGES.values())
+    return start_render_pool() if RENDER_WORKERS > 1 else None
+
+@st.cache_resource
+def start_metrics_server():
+    """Serves Prometheus metrics at :PRESSPLAY_METRICS_PORT/metrics, if that's set."""
+    port = os.environ.get("PRESSPLAY_METRICS_PORT")
+    return metrics.serve(int(port)) if port else None
+
+def show_run_summary(run):
+    """Shows where a render's time went: per-stage timings, frame timing and counters."""
+    with st.expander("Run summary"):
+        columns = st.columns(len(run["stages"]) + 1)
+        columns[0].metric("Total", f"{run['total_s']:.2f} s")
+        for column, (stage, seconds) in zip(columns[1:], run["stages"].items()):
+            column.metric(stage.replace("_", " ").title(), f"{seconds:.2f} s")
+        frames = run["frames"]
+        if frames["frames"]:
+            st.caption(
+                f"{frames['frames']} frames encoded: {frames['mean_render_ms']:.1f} ms on average to compose a frame "
+                f"(slowest {frames['slowest_render_ms']:.1f} ms), {frames['write_s']:.1f} s waiting on the encoder, "
+                f"{frames['repeated']} unchanged frames reused."
+            )
+        st.json(run["counters"], expanded=False)
+
+def static_serving(path=None):
+    """Whether the static file server is on, and will serve `path` (if given): it must be small enough."""
+    if not st.get_option("server.enableStaticServing"):
+        return False
+    return path is None or os.path.getsize(path) <= MAX_STATIC_FILE_BYTES
+
+def static_url(path):
+    """The URL a file under static/ is served at."""
+    return "app/static/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+def show_player(placeholder, path):
+    """Plays a video file or HLS playlist, streamed from disk by the static file server if it can."""
+    if static_serving(path):
+        with placeholder.container():
+            st.iframe(PLAYER_HTML % {"src": json.dumps(static_url(path))}, height=PLAYER_HEIGHT)
+    else:
+        placeholder.video(path)
+
+def show_download(result):
+    """A download link for the finished MP4, served from disk in chunks if the static file server can."""
+    is_draft = result["profile"] == "draft"
+    label = "Download Draft Preview (.mp4)" if is_draft else "Download Generated Video (.mp4)"
+    file_name = "pib_draft_preview.mp4" if is_draft else "pib_generated_video.mp4"
+    if static_serving(result["video"]):
+        st.markdown(f'<a href="{static_url(result["video"])}" download="{file_name}">📥 {label}</a>',
+                    unsafe_allow_html=True)
+    else:
+        with open(result["video"], "rb") as f:
+            st.download_button(label=label, data=f, file_name=file_name, mime="video/mp4")
+
+def show_warnings(status):
+    """Shows the problems a job worked around, such as uploads it couldn't read."""
+    for message in status["artifacts"].get("warnings", []):
+        st.warning(message)
+
+
+def show_job(job, video_placeholder, status_placeholder, audio_placeholder):
+    """Polls a render job, showing its progress until it finishes, then shows the result.
+
+    If the job streams its scenes, the player starts on the first one while
+    the rest are still rendering, and keeps following the stream.
+    """
+    from pipeline import STAGES, default_render_cache
+    audio_shown = False
+    stream_shown = False
+    was_running = not job.is_finished
+    while True:
+        status = job.snapshot()
+        
+        # Display audio as soon as the job has produced it
+        if not audio_shown and "audio" in status["artifacts"]:
+            audio_placeholder.audio(status["artifacts"]["audio"], format='audio/mp4')
+            audio_shown = True
+            if was_running:
+                st.toast("Audio generated successfully!")
+        
+        # Start playback as soon as the first scene is live; the player is written only once
+        if was_running and not stream_shown and "stream" in status["artifacts"]:
+            show_player(video_placeholder, status["artifacts"]["stream"])
+            stream_shown = True
+        
+        if status["state"] in (DONE, FAILED):
+            break
+        
+        with status_placeholder.container():
+            show_warnings(status)
+            if status["state"] == QUEUED or status["stage"] is None:
+                st.progress(0.0, text="Waiting for a free render worker...")
+            else:
+                stage_index = STAGES.index(status["stage"])
+                text = status["stage"]
+                if status["frames"]:
+                    text += f" ({status['frames'][0]}/{status['frames'][1]} frames)"
+                st.progress((stage_index + status["progress"]) / len(STAGES), text=text)
+        time.sleep(POLL_INTERVAL)
+    
+    if status["state"] == FAILED:
+        status_placeholder.error(f"An unexpected error occurred: {status['error']}")
+        return
+    
+    result = status["result"]
+    # A streamed video is already playing; swapping the player would restart it
+    if not stream_shown:
+        show_player(video_placeholder, result["video"])
+    
+    with status_placeholder.container():
+        show_warnings(status)
+        show_download(result)
+        if result["cached"]:
+            st.success("Generation Complete! (served instantly from the render cache)")
+        else:
+            st.success("Generation Complete!")
+            if stream_shown and result.get("first_segment_s") is not None:
+                st.caption(f"Playback could start {result['first_segment_s']:.1f} s into the render.")
+            if result["scenes_reused"]:
+                total_scenes = result["scenes_rendered"] + result["scenes_reused"]
+                st.caption(
+                    f"Re-rendered {result['scenes_rendered']} of {total_scenes} scenes; "
+                    "the rest were unchanged and reused from earlier renders."
+                )
+        cache_stats = default_render_cache().stats()
+        st.caption(
+            f"Render cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['entries']} videos stored"
+        )
+        if result.get("metrics"):
+            show_run_summary(result["metrics"])
 
 # --- Page Functions ---
 
@@ -124,6 +276,10 @@ def show_home_page():
 def show_create_page():
     """Displays the main Video Generation Page."""
     st.title("🎬 Create Your Video")
+    # Warm the renderer while the form is being filled in, not when it's submitted
+    render_pool = get_render_pool()
+    from pipeline import generate_video
+    from render import DEFAULT_CAMERA, PROFILES
     
     col1, col2 = st.columns([0.4, 0.6]) # Left column 40%, Right 60%
     
@@ -138,6 +294,14 @@ def show_create_page():
             )
             lang_code = LANGUAGES[selected_language_name]
             
+            # Camera Motion
+            camera_name = st.selectbox(
+                "Camera Motion",
+                options=list(CAMERA_OPTIONS.keys()),
+                index=list(CAMERA_OPTIONS.values()).index(DEFAULT_CAMERA)
+            )
+            camera = CAMERA_OPTIONS[camera_name]
+            
             # Image Upload
             uploaded_files = st.file_uploader(
                 "Select Background Images",
@@ -152,142 +316,54 @@ def show_create_page():
                 value="The Union Cabinet, chaired by the Prime Minister, has approved a landmark scheme. This initiative aims to empower millions. The government has allocated a significant budget for this purpose. Online registration portals will be launched next month."
             )
             
-            generate_button = st.button("Generate Full Video", type="primary", use_container_width=True)
+            draft_col, full_col = st.columns(2)
+            # A low-resolution draft renders in seconds; the full render reuses its audio and images
+            draft_button = draft_col.button("Quick Draft Preview", use_container_width=True)
+            generate_button = full_col.button("Generate Full Video", type="primary", use_container_width=True)
 
     with col2:
         st.subheader("2. Generated Video")
         video_placeholder = st.empty()
         video_placeholder.info("Your generated video and download link will appear here.")
+        status_placeholder = st.empty()
+    
+    audio_placeholder = col1.empty()
 
     # --- Generation Logic ---
-    if generate_button:
+    job_queue = get_job_queue()
+    if generate_button or draft_button:
         # --- 1. Validate Inputs ---
+        scenes = parse_text_to_scenes(script_text, lang_code)
         if not script_text.strip():
             st.error("Please enter some text in the text area.")
         elif not uploaded_files:
             st.error("Please upload at least one background image.")
+        elif not scenes:
+            st.error("No sentences found in text. Cannot proceed.")
         else:
-            temp_files = [] # To store paths for cleanup
-            video_path = "final_pib_video.mp4"
-            
-            try:
-                # --- 2. Save Uploaded Images ---
-                with st.spinner("Step 1/4: Loading images..."):
-                    temp_image_paths = save_uploaded_files(uploaded_files)
-                    if not temp_image_paths:
-                        st.error("Could not save uploaded images. Please try again.")
-                        st.stop()
-                    temp_files.extend(temp_image_paths)
-
-                # --- 3. Generate Audio ---
-                with st.spinner(f"Step 2/4: Generating '{selected_language_name}' audio..."):
-                    sentences = parse_text_to_sentences(script_text)
-                    if not sentences:
-                        st.error("No sentences found in text. Cannot proceed.")
-                        st.stop()
-                    
-                    full_text_for_audio = " ".join(sentences)
-                    tts = gTTS(text=full_text_for_audio, lang=lang_code, slow=False)
-                    
-                    audio_bytes_io = io.BytesIO()
-                    tts.write_to_fp(audio_bytes_io)
-                    audio_bytes_io.seek(0)
-                    
-                    audio_path = "temp_audio.mp3"
-                    temp_files.append(audio_path)
-                    with open(audio_path, 'wb') as f:
-                        f.write(audio_bytes_io.read())
-                    
-                    # Display audio immediately
-                    st.toast("Audio generated successfully!")
-                    col1.audio(audio_bytes_io, format='audio/mp3')
-
-                # --- 4. Create Video Scenes ---
-                with st.spinner("Step 3/4: Creating video scenes... (This is the longest step)"):
-                    audio_clip = AudioFileClip(audio_path)
-                    # Estimate duration per scene.
-                    scene_duration = audio_clip.duration / len(sentences)
-                    
-                    video_clips = []
-                    crossfade_duration = 0.5 # 0.5 second crossfade
-                    
-                    for i, sentence in enumerate(sentences):
-                        # Cycle through the uploaded images
-                        img_path = temp_image_paths[i % len(temp_image_paths)]
-                        
-                        # Create ImageClip
-                        img_clip = ImageClip(img_path, plugin="pillow").set_duration(scene_duration).resize(height=720)
-                        # Resize to a standard 16:9 width based on the 720 height
-                        img_clip = img_clip.fx(vfx.crop, width=1280, height=720, x_center=img_clip.w/2, y_center=img_clip.h/2)
-
-                        # Add Ken Burns effect (slow zoom-in)
-                        img_clip_zoomed = img_clip.fx(vfx.resize, 1.1) # Zoom to 110%
-                        img_clip = CompositeVideoClip([img_clip_zoomed.set_position(("center", "center"))], size=(1280, 720))
-                        
-                        # Create TextClip
-                        txt_clip = TextClip(
-                            sentence,
-                            font='Arial-Bold',
-                            fontsize=36,
-                            color='white',
-                            bg_color='rgba(0, 0, 0, 0.6)',
-                            size=(1200, None), # 1200px width, auto-height
-                            method='caption'
-                        ).set_duration(scene_duration).set_position(('center', 0.8), relative=True)
-                        
-                        # Compose the scene
-                        scene = CompositeVideoClip([img_clip, txt_clip])
-                        
-                        # Add crossfade
-                        if video_clips: # Add fade-in only from the second clip onwards
-                            scene = scene.fx(vfx.fadein, crossfade_duration)
-
-                        video_clips.append(scene)
-
-                # --- 5. Assemble Final Video ---
-                with st.spinner("Step 4/4: Assembling final video..."):
-                    # The crossfade effect is handled by overlapping clips
-                    final_video = concatenate_videoclips(video_clips, method="compose", padding=-crossfade_duration)
-                    final_video = final_video.set_audio(audio_clip)
-                    
-                    temp_files.append(video_path)
-                    
-                    final_video.write_videofile(
-                        video_path,
-                        codec="libx264",
-                        audio_codec="aac",
-                        temp_audiofile='temp-audio.m4a', 
-                        remove_temp=True,
-                        fps=24
-                    )
-                    
-                    audio_clip.close()
-                    final_video.close()
-                    
-                    # Display the final video
-                    video_file = open(video_path, 'rb')
-                    video_bytes = video_file.read()
-                    video_placeholder.video(video_bytes)
-                    
-                    # Add the download button
-                    video_placeholder.download_button(
-                        label="Download Generated Video (.mp4)",
-                        data=video_bytes,
-                        file_name="pib_generated_video.mp4",
-                        mime="video/mp4"
-                    )
-                    st.success("Generation Complete!")
-
-            except Exception as e:
-                st.error(f"An unexpected error occurred: {e}")
-                if "ImageMagick" in str(e):
-                     st.error("This error often means ImageMagick is not installed on your system. Please see the 'How It Works' page for setup instructions.")
-            
-            finally:
-                # Clean up all temporary files
-                cleanup_files(temp_files)
-                if os.path.exists("temp-audio.m4a"):
-                    os.remove("temp-audio.m4a")
+            # --- 2. Submit the Render Job ---
+            # Each job runs on the shared worker pool in its own workspace, so
+            # several sessions can render at once without clobbering each other's files
+            previous_job_id = st.session_state.pop("job_id", None)
+            if previous_job_id:
+                job_queue.discard(previous_job_id)
+            st.session_state["job_id"] = job_queue.submit(
+                generate_video,
+                scenes,
+                [file.getvalue() for file in uploaded_files],
+                lang_code,
+                PROFILES["draft"] if draft_button else PROFILES["full"],
+                camera=camera,
+                stream=static_serving(), # Players can only follow the stream if it is served
+                executor=render_pool
+            )
+
+    # --- 3. Follow the Job ---
+    # The job keeps running if the page reruns; we just pick it up again here
+    job_id = st.session_state.get("job_id")
+    job = job_queue.get(job_id) if job_id else None
+    if job:
+        show_job(job, video_placeholder, status_placeholder, audio_placeholder)
 
 def show_how_it_works_page():
     """Displays the 'How It Works' Page."""
@@ -299,36 +375,37 @@ def show_how_it_works_page():
     
     st.subheader("The Generation Pipeline")
     st.markdown("""
-    When you click "Generate Full Video", the following steps happen:
+    When you click "Generate Full Video" (or "Quick Draft Preview", which renders the same video at 640x360 and 12 fps in a fraction of the time), your request is queued as a render job with its own private workspace, so many people can generate videos at the same time. The job then runs these steps while the page shows its progress:
 
-    1.  **Image Loading:** The images you uploaded are saved to temporary files on the server.
-    2.  **Sentence Parsing:** Your script is split into individual sentences. This will determine the "scenes" of your video.
-    3.  **Audio Generation:** The *entire* script is sent to the Google Text-to-Speech (`gTTS`) API, which returns a single `.mp3` file of the full audio in the language you selected.
-    4.  **Scene Creation:** The app divides the total audio duration by the number of sentences to get an "average duration" for each scene.
+    1.  **Image Loading:** Each image you uploaded is decoded once, centre-cropped and scaled to 1280x720, and kept in memory for every scene that uses it.
+    2.  **Sentence Parsing:** Your script is split into individual sentences, following the punctuation of its language (including the danda `।` and the Urdu full stop `۔`) and skipping abbreviations like "Shri." and "Rs.". Very short sentences in the same paragraph are joined and very long ones split at their clauses, so every scene runs for a few seconds and every caption fits on screen. These become the "scenes" of your video; editing a sentence later only changes the scenes around it.
+    3.  **Audio Generation:** Each sentence is sent to the Google Text-to-Speech (`gTTS`) API in parallel, in the language you selected. Clips are cached on disk, so repeated sentences and re-renders never synthesize the same audio twice.
+    4.  **Scene Creation:** The app measures each sentence's audio clip to get the exact duration of its scene.
     5.  **Video Assembly:** The app loops through each sentence and:
         * Takes one of your uploaded images.
-        * Applies a slow "Ken Burns" (zoom) effect.
+        * Moves a virtual camera over it: a slow zoom or pan ("Ken Burns" effect), eased in and out. Each frame is cut from one high-resolution copy of the image, so the motion stays smooth.
         * Overlays the sentence text on top with a semi-transparent background.
-        * Sets the scene's duration to the "average duration" calculated in Step 4.
-    6.  **Final Render:** All the individual scenes are stitched together with a smooth crossfade using `MoviePy`. The full `.mp3` audio is attached, and the final `.mp4` video is created.
-    7.  **Display & Download:** The final video is displayed on the page, and a download button appears.
+        * Sets the scene's duration to the length of its sentence's audio, as measured in Step 4.
+    6.  **Final Render:** The scenes are laid out on a single timeline. Each video frame is computed by blending only the scenes on screen at that moment (so crossfades cost nothing extra elsewhere), and frames are streamed straight into `ffmpeg`. Long videos are split into segments that render in parallel on every CPU core and are then joined without re-encoding, with the sentence clips added as one audio track.
+    7.  **Display & Download:** Each scene is published to a live (HLS) stream as soon as it is encoded, so the video starts playing while the rest is still rendering. The finished MP4 is then served straight from disk for playback and download.
+
+    Every intermediate result (audio clips, captions, encoded scenes and finished videos) is cached by its content. Generating the same release twice is instant, and after fixing a typo only the scenes that changed are rendered again.
     """)
     
     st.subheader("Key Technologies Used")
     st.markdown("""
     * **Streamlit:** For creating this entire interactive web application.
     * **gTTS (Google Text-to-Speech):** For generating the multilingual audio.
-    * **Pillow (PIL):** For reading and handling the uploaded images.
-    * **OpenCV (cv2):** Used by `MoviePy` as a backend for reading and writing video frames.
-    * **MoviePy:** The core engine for all video editing. It programmatically creates text overlays, composites scenes, adds crossfades, and renders the final MP4 file.
+    * **Pillow (PIL):** For reading and handling the uploaded images, and for drawing the text overlays.
+    * **NumPy:** Blends backgrounds, captions and crossfades into each video frame.
+    * **FFmpeg:** Encodes the streamed frames and the audio track into the final MP4 file, and cuts the live HLS stream.
+    * **hls.js:** Plays the stream in the browser while the rest of the video is still rendering.
     """)
     
-    st.warning("""
-    **Important Setup Requirement: ImageMagick**
+    st.info("""
+    **Fonts for Indian Languages**
 
-    `MoviePy`'s `TextClip` function (which creates the text overlays) **requires** a separate program called **ImageMagick** to be installed on the computer running this app.
-
-    If you see an error related to "ImageMagick" or "policy.xml", it means this program is not installed. You must download and install it from the [official ImageMagick website](https://imagemagick.org/script/download.php).
+    Text overlays are drawn directly with `Pillow`, so ImageMagick is no longer needed. For Hindi, Tamil, Urdu and the other Indian scripts to display correctly, the server needs the matching **Noto Sans** fonts (e.g. `fonts-noto` on Linux) and a Pillow build with **Raqm** support. You can point the app at a folder of fonts with the `PRESSPLAY_FONT_DIR` environment variable.
     """)
 
 def show_about_page():
@@ -354,6 +431,8 @@ def show_about_page():
 # --- Main App Logic (Navigation) ---
 
 def main():
+    start_metrics_server()
+
     # Sidebar Navigation
     st.sidebar.title("PressPlay AI")
     st.sidebar.markdown("---")
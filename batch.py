@@ -0,0 +1,237 @@
+"""Headless batch rendering: many releases x languages from a manifest.
+
+    python batch.py manifest.json --out videos/ [--jobs 2] [--profile full] [--camera ken_burns] [--tts stub]
+
+The manifest is JSON:
+
+    {
+      "releases": [
+        {"id": "cabinet-scheme", "text": "The Union Cabinet ...", "languages": ["en", "hi"],
+         "images": ["images/cabinet/*.jpg"]},
+        {"id": "blog-394", "url": "https://blogs.pib.gov.in/blogsdescr.aspx?feaaid=394",
+         "languages": ["English", "Tamil"], "images": ["images/logo.png"]}
+      ]
+    }
+
+Languages may be codes, plain names or the names shown in the app. Image paths may be
+globs, relative to the manifest. Each script is parsed once and each image
+set prepared once, then every (release, language) render runs on the job
+queue. Finished outputs are recorded in <out>/batch_state.json, so a rerun
+after a crash skips them. A timing report is written to <out>/batch_report.json.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+from images import prepare_images
+from jobs import DONE, JobQueue
+from pipeline import generate_video
+from render import CAMERAS, DEFAULT_CAMERA, PROFILES, RENDER_WORKERS, background_size, start_render_pool
+from scraper import PIBScraper
+from storage import atomic_path, atomic_write
+from text_processing import LANGUAGES, parse_text_to_scenes
+from tts import GTTSBackend, StubBackend
+
+TTS_BACKENDS = {"gtts": GTTSBackend, "stub": StubBackend}
+POLL_INTERVAL = 0.5
+
+
+# --- Manifest ---
+
+def resolve_language(language):
+    """Accepts a language code, an app display name or a plain name ("Hindi") and returns the code."""
+    if language in LANGUAGES.values():
+        return language
+    if language in LANGUAGES:
+        return LANGUAGES[language]
+    for name, code in LANGUAGES.items():
+        if name.split("(")[0].strip().lower() == language.strip().lower():
+            return code
+    raise ValueError(f"Unknown language: {language!r}")
+
+
+def resolve_images(patterns, base_dir):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.join(base_dir, pattern)))
+        if not matches:
+            raise ValueError(f"No images match {pattern!r}")
+        paths.extend(matches)
+    return paths
+
+
+def load_manifest(path):
+    """Reads the manifest and normalizes every release entry."""
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    releases = []
+    for i, entry in enumerate(manifest["releases"]):
+        if not entry.get("text") and not entry.get("url"):
+            raise ValueError(f"Release {i} needs a 'text' or a 'url'")
+        releases.append({
+            "id": str(entry.get("id", f"release{i + 1}")),
+            "text": entry.get("text"),
+            "url": entry.get("url"),
+            "languages": [resolve_language(lang) for lang in entry["languages"]],
+            "images": resolve_images(entry["images"], base_dir),
+        })
+    return releases
+
+
+# --- Resumable state ---
+
+class BatchState:
+    """Records finished outputs in a JSON file, rewritten atomically after every change."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                self.done = json.load(f)
+        except (OSError, ValueError):
+            self.done = {}
+
+    def is_done(self, key, output_path):
+        return key in self.done and os.path.exists(output_path)
+
+    def mark_done(self, key, output_path):
+        with self._lock:
+            self.done[key] = output_path
+            atomic_write(self.path, json.dumps(self.done, indent=2))
+
+
+# --- Batch run ---
+
+def run_batch(releases, out_dir, profile, tts_backend, jobs, camera=DEFAULT_CAMERA):
+    """Renders every (release, language) pair; returns the per-video report entries."""
+    os.makedirs(out_dir, exist_ok=True)
+    state = BatchState(os.path.join(out_dir, "batch_state.json"))
+
+    # Fetch every URL-based release concurrently, once.
+    urls = [release["url"] for release in releases if not release["text"]]
+    texts = {}
+    if urls:
+        scraper = PIBScraper()
+        texts = scraper.fetch_many(urls)
+        scraper.close()
+    report = []
+    queue = JobQueue(max_workers=jobs)
+    # One warm pool of render processes for every job, instead of a pool per video.
+    executor = start_render_pool() if RENDER_WORKERS > 1 else None
+    pending = []
+    for release in releases:
+        outputs = {
+            lang: os.path.join(out_dir, release["id"], f"{release['id']}_{lang}.mp4")
+            for lang in release["languages"]
+        }
+        todo = [lang for lang, path in outputs.items() if not state.is_done(f"{release['id']}/{lang}", path)]
+        for lang in [lang for lang in outputs if lang not in todo]:
+            report.append({"release": release["id"], "language": lang, "status": "skipped",
+                           "output": outputs[lang]})
+        if not todo:
+            continue
+
+        # Parse the script and prepare the image set once for all its languages.
+        text = release["text"] or texts.get(release["url"])
+        scenes = parse_text_to_scenes(text) if text else []
+        if not scenes:
+            for lang in todo:
+                report.append({"release": release["id"], "language": lang, "status": "failed",
+                               "error": "No text could be loaded for this release"})
+            continue
+        images = []
+        for path in release["images"]:
+            with open(path, "rb") as f:
+                images.append(f.read())
+        prepare_images(images, background_size(profile.size, camera)) # Warms the shared frame cache
+
+        os.makedirs(os.path.dirname(outputs[todo[0]]), exist_ok=True)
+        for lang in todo:
+            job_id = queue.submit(generate_video, scenes, images, lang, profile, tts_backend, camera=camera,
+                                  executor=executor)
+            pending.append((release["id"], lang, outputs[lang], job_id,
+                            sum(len(scene.sentences) for scene in scenes)))
+
+    # Collect the results as they finish.
+    while pending:
+        still_running = []
+        for release_id, lang, output_path, job_id, sentence_count in pending:
+            job = queue.get(job_id)
+            if not job.is_finished:
+                still_running.append((release_id, lang, output_path, job_id, sentence_count))
+                continue
+            status = job.snapshot()
+            entry = {
+                "release": release_id,
+                "language": lang,
+                "sentences": sentence_count,
+                "status": status["state"],
+                "wall_s": round(job.finished - job.started, 3),
+                "queued_s": round(job.started - job.created, 3),
+                "stages": {stage: round(t, 3) for stage, t in status["timings"].items()},
+            }
+            if status["state"] == DONE:
+                # Copy under a temp name first, so a crash never leaves a partial "finished" file.
+                with atomic_path(output_path) as tmp_path:
+                    shutil.copyfile(status["result"]["video"], tmp_path)
+                state.mark_done(f"{release_id}/{lang}", output_path)
+                entry.update(output=output_path, cached=status["result"]["cached"])
+            else:
+                entry["error"] = status["error"]
+            queue.discard(job_id)
+            report.append(entry)
+            print(f"[{entry['status']}] {release_id} ({lang}) in {entry['wall_s']}s")
+        pending = still_running
+        if pending:
+            time.sleep(POLL_INTERVAL)
+    if executor:
+        executor.shutdown()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render many PIB releases in many languages, headlessly.")
+    parser.add_argument("manifest", help="JSON manifest of releases (see this file's docstring)")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--jobs", type=int, default=2, help="renders to run at the same time")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="full")
+    parser.add_argument("--camera", choices=CAMERAS, default=DEFAULT_CAMERA, help="camera motion")
+    parser.add_argument("--tts", choices=sorted(TTS_BACKENDS), default="gtts",
+                        help="speech backend ('stub' renders silent audio, for dry runs)")
+    args = parser.parse_args(argv)
+
+    releases = load_manifest(args.manifest)
+    start = time.perf_counter()
+    report = run_batch(releases, args.out, PROFILES[args.profile], TTS_BACKENDS[args.tts](), args.jobs,
+                       args.camera)
+    elapsed = time.perf_counter() - start
+
+    rendered = [entry for entry in report if entry["status"] == DONE]
+    failed = [entry for entry in report if entry["status"] == "failed"]
+    summary = {
+        "wall_s": round(elapsed, 3),
+        "videos_rendered": len(rendered),
+        "videos_skipped": sum(entry["status"] == "skipped" for entry in report),
+        "videos_failed": len(failed),
+        "videos_per_hour": round(len(rendered) / elapsed * 3600, 1) if rendered else 0.0,
+        "profile": args.profile,
+        "camera": args.camera,
+        "jobs": args.jobs,
+    }
+    with open(os.path.join(args.out, "batch_report.json"), "w") as f:
+        json.dump({"summary": summary, "videos": report}, f, indent=2, ensure_ascii=False)
+    print(f"Rendered {summary['videos_rendered']} videos in {summary['wall_s']}s "
+          f"({summary['videos_per_hour']} videos/hour); {summary['videos_skipped']} skipped, "
+          f"{summary['videos_failed']} failed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,673 @@
+"""Benchmarks for the video generation pipeline.
+
+    python bench.py pipeline [--sizes 5,20,50,100,200] [--languages en,hi] [--json out.json]
+                                                # wall time and peak RSS per pipeline stage
+    python bench.py profiles [--sentences 30]   # wall time and file size per render profile
+    python bench.py workers [--sentences 50]    # render time with 1..N worker processes
+    python bench.py motion [--sentences 10]     # frame composition speed per camera motion
+    python bench.py startup [--repeat 5]        # app import time and first-render latency, cold and warm
+    python bench.py segment [--megabytes 1,4,16] [--languages en,hi,ur]
+                                                # sentence segmenter throughput on large releases
+    python bench.py edits [--sentences 200] [--edits 50]
+                                                # scenes re-rendered after a one-sentence edit;
+                                                # exits 1 if any edit touches too many
+    python bench.py compare baseline.json current.json [--threshold 0.15]
+                                                # flags regressions; exits 1 if there are any
+
+Everything runs offline: gTTS is replaced by the deterministic StubBackend
+and the images are generated.
+"""
+import argparse
+import collections
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+import captions
+import pipeline
+from images import frame_cache, prepare_images
+from jobs import Job
+from render import (CAMERAS, DEFAULT_CAMERA, PROFILES, ZOOM, FrameRenderer, background_size, build_timeline,
+                    render_audio_track, render_video, scene_looks, start_render_pool)
+from render_cache import RenderCache
+from text_processing import iter_sentences, parse_text_to_scenes
+from tts import AudioCache, StubBackend, synthesize_sentences
+
+IMAGE_COLORS = [(180, 40, 40), (40, 160, 60), (40, 60, 180), (200, 160, 40), (120, 40, 160)]
+
+# The pipeline stages, as timed by the pipeline benchmark: parsing, then
+# generate_video's own stages (see its RunMetrics).
+STAGES = ["parse", "cache_lookup", "images", "tts", "scenes", "encode"]
+# The job stage the UI shows during each of generate_video's stages.
+JOB_STAGES = dict(zip(pipeline.STAGES, ["images", "tts", "scenes", "encode"]))
+
+# Result fields `compare` checks, and whether a bigger value is better.
+# Every other field identifies the row.
+METRICS = {
+    "wall_s": False,
+    "peak_rss_mb": False,
+    "render_fps": True,
+    "size_kb": False,
+    "speedup": True,
+    "ms_per_frame": False,
+    "compose_fps": True,
+    "mb_per_s": True,
+    "mean_changed": False,
+    "max_changed": False,
+}
+# The most scene segments a one-sentence edit may re-render: the scenes it
+# regroups (up to the anchor sentences around it) and the scene that fades
+# in over the last of them.
+MAX_CHANGED_SEGMENTS = 8
+EDIT_IMAGES = 3 # Images the edit benchmark's scenes pick backgrounds from
+# Changes smaller than this are noise, whatever the relative change.
+MIN_DELTA = {"wall_s": 0.05, "peak_rss_mb": 5.0, "render_fps": 1.0, "size_kb": 1.0, "speedup": 0.05,
+             "ms_per_frame": 0.5, "compose_fps": 1.0, "mb_per_s": 0.2,
+             "mean_changed": 0.1, "max_changed": 1}
+
+
+# --- Synthetic inputs ---
+
+CLAUSES = {
+    "en": [
+        "The Union Cabinet, chaired by the Prime Minister, has approved a landmark scheme",
+        "which aims to empower millions of citizens across the country",
+        "with a significant budget allocated for the coming financial year",
+        "and online registration portals that will be launched next month",
+    ],
+    "hi": [
+        "प्रधानमंत्री की अध्यक्षता में केंद्रीय मंत्रिमंडल ने एक ऐतिहासिक योजना को मंज़ूरी दी है",
+        "जिसका उद्देश्य देश भर के करोड़ों नागरिकों को सशक्त बनाना है",
+        "आगामी वित्त वर्ष के लिए एक बड़ा बजट आवंटित किया गया है",
+        "और ऑनलाइन पंजीकरण पोर्टल अगले महीने शुरू किए जाएंगे",
+    ],
+    "ur": [
+        "وزیر اعظم کی صدارت میں مرکزی کابینہ نے ایک تاریخی اسکیم کو منظوری دی ہے",
+        "جس کا مقصد ملک بھر کے کروڑوں شہریوں کو بااختیار بنانا ہے",
+        "آئندہ مالی سال کے لیے ایک بڑا بجٹ مختص کیا گیا ہے",
+        "اور آن لائن رجسٹریشن پورٹل اگلے مہینے شروع کیے جائیں گے",
+    ],
+}
+TERMINATORS = {"hi": "।", "ur": "۔"}
+
+
+def synthetic_sentences(count, lang_code="en"):
+    """A release-like script of `count` sentences of varying length.
+
+    Languages without sample clauses get the English ones.
+    """
+    clauses = CLAUSES.get(lang_code, CLAUSES["en"])
+    end = TERMINATORS.get(lang_code, ".")
+    return [f"{i + 1}: " + ", ".join(clauses[:1 + i % len(clauses)]) + end for i in range(count)]
+
+
+def synthetic_release(sentences):
+    """Joins sentences into release text, a paragraph break every few sentences."""
+    paragraphs = [" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+    return "\n\n".join(paragraphs)
+
+
+def synthetic_images(count, size=(1600, 1000)):
+    """`count` distinct JPEG uploads."""
+    images = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, IMAGE_COLORS[i % len(IMAGE_COLORS)]).save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def print_table(rows, columns):
+    widths = [max(len(col), *(len(str(row[col])) for row in rows)) for col in columns]
+    print("  ".join(col.ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[col]).ljust(w) for col, w in zip(columns, widths)))
+
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+
+# --- Measurement ---
+
+def _rss_bytes(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def tree_rss_bytes(pid=None):
+    """Resident memory of a process and all its descendants (ffmpeg, render workers)."""
+    pending, total = [pid or os.getpid()], 0
+    while pending:
+        pid = pending.pop()
+        try:
+            total += _rss_bytes(pid)
+        except (OSError, ValueError):
+            continue # Exited between listing and reading
+        pending.extend(_children(pid))
+    return total
+
+
+class StageMeter:
+    """Times a block and samples the peak RSS of this process tree while it runs.
+
+    With a `label` callable, each sample is also credited to the stage it
+    returns at that moment, giving a peak per stage in `peaks`. Without
+    /proc (e.g. macOS) the peak falls back to this process's lifetime
+    high-water mark from getrusage, and there are no per-stage peaks.
+    """
+
+    def __init__(self, interval=0.01, label=None):
+        self.interval = interval
+        self.label = label
+        self.has_proc = os.path.exists(f"/proc/{os.getpid()}/statm")
+        self.wall_s = None
+        self.peak_rss = 0
+        self.peaks = {}
+        self._stop = threading.Event()
+
+    def _record(self):
+        rss = tree_rss_bytes()
+        self.peak_rss = max(self.peak_rss, rss)
+        if self.label:
+            stage = self.label()
+            self.peaks[stage] = max(self.peaks.get(stage, 0), rss)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._record()
+
+    def __enter__(self):
+        if self.has_proc:
+            self._record()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._start
+        if self.has_proc:
+            self._stop.set()
+            self._thread.join()
+            self._record()
+        else:
+            scale = 1 if sys.platform == "darwin" else 1024 # ru_maxrss is KiB on Linux
+            self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        return False
+
+    @property
+    def peak_rss_mb(self):
+        return round(self.peak_rss / 2 ** 20, 1)
+
+
+def environment():
+    """Where the numbers came from, stored with them so baselines stay comparable."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# --- Benchmarks ---
+
+def run_pipeline(sentence_count, image_count, lang_code, profile, workers, workdir):
+    """One cold end-to-end render of a synthetic release; returns a row per stage.
+
+    The render is the app's own: pipeline.generate_video with the render,
+    segment and TTS caches, one encoded segment per scene, timed by its
+    RunMetrics. Nothing is shared with earlier runs: the caches are fresh
+    and the in-memory frame and caption caches are emptied.
+    """
+    run_dir = tempfile.mkdtemp(dir=workdir)
+    captions.caption_cache.clear()
+    frame_cache.clear()
+    uploads = synthetic_images(image_count)
+    release = synthetic_release(synthetic_sentences(sentence_count, lang_code))
+    with StageMeter() as parse_meter:
+        parsed = parse_text_to_scenes(release, lang_code)
+    # The render uses the generated sentences, so every run has exactly
+    # `sentence_count` scenes whatever the parser makes of the language.
+    sentences = synthetic_sentences(sentence_count, lang_code)
+    # Started (and warmed) before timing, like the app's long-lived pool.
+    executor = start_render_pool(workers) if workers > 1 else None
+    job = Job("bench", tempfile.mkdtemp(dir=run_dir))
+    try:
+        with StageMeter(label=lambda: JOB_STAGES.get(job.stage, "cache_lookup")) as meter:
+            result = pipeline.generate_video(
+                job, sentences, uploads, lang_code, profile, StubBackend(),
+                cache=RenderCache(os.path.join(run_dir, "renders")),
+                segment_cache=RenderCache(os.path.join(run_dir, "segments")),
+                tts_cache=AudioCache(os.path.join(run_dir, "tts")),
+                executor=executor, workers=workers,
+            )
+    finally:
+        if executor:
+            executor.shutdown()
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    metrics = result["metrics"]
+    stages = dict(metrics["stages"], parse=parse_meter.wall_s)
+    peaks = dict(meter.peaks, parse=parse_meter.peak_rss)
+    config = {"sentences": sentence_count, "images": image_count, "language": lang_code,
+              "profile": profile.name}
+    rows = [dict(config, stage=stage, wall_s=round(stages.get(stage, 0.0), 4),
+                 peak_rss_mb=round(peaks.get(stage, meter.peak_rss) / 2 ** 20, 1))
+            for stage in STAGES]
+    rows.append(dict(config, stage="total", wall_s=round(parse_meter.wall_s + metrics["total_s"], 4),
+                     peak_rss_mb=max(meter.peak_rss_mb, parse_meter.peak_rss_mb),
+                     parsed_scenes=len(parsed), frames=metrics["counters"]["frames"],
+                     scenes_rendered=result["scenes_rendered"]))
+    return rows
+
+
+def bench_pipeline(args, workdir):
+    profile = PROFILES[args.profile]
+    rows = []
+    for count, images, lang_code in itertools.product(args.sizes, args.image_counts, args.languages):
+        print(f"{count} sentences, {images} images, {lang_code}...", file=sys.stderr)
+        rows.extend(run_pipeline(count, images, lang_code, profile, args.workers, workdir))
+    print_table(rows, ["sentences", "images", "language", "stage", "wall_s", "peak_rss_mb"])
+    return rows
+
+def bench_profiles(args, workdir):
+    sentences = synthetic_sentences(args.sentences)
+    images = synthetic_images(args.images)
+    audio = synthesize_sentences(sentences, "en", backend=StubBackend(),
+                                 cache=AudioCache(os.path.join(workdir, "tts")))
+    rows = []
+    for profile in PROFILES.values():
+        start = time.perf_counter()
+        frames = prepare_images(images, background_size(profile.size, DEFAULT_CAMERA))
+        track = render_audio_track(audio, os.path.join(workdir, f"{profile.name}.m4a"), profile.fps)
+        timeline = build_timeline(sentences, [clip.duration for clip in audio], frames, "en", profile)
+        out_path = os.path.join(workdir, f"{profile.name}.mp4")
+        render_video(timeline, out_path, track, workdir, args.workers)
+        elapsed = time.perf_counter() - start
+        rows.append({
+            "profile": profile.name,
+            "resolution": f"{profile.size[0]}x{profile.size[1]}",
+            "fps": profile.fps,
+            "preset": profile.preset,
+            "crf": profile.crf,
+            "frames": timeline.total_frames,
+            "wall_s": round(elapsed, 2),
+            "render_fps": round(timeline.total_frames / elapsed, 1),
+            "size_kb": round(os.path.getsize(out_path) / 1024, 1),
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def bench_workers(args, workdir):
+    sentences = synthetic_sentences(args.sentences)
+    audio = synthesize_sentences(sentences, "en", backend=StubBackend(),
+                                 cache=AudioCache(os.path.join(workdir, "tts")))
+    track = render_audio_track(audio, os.path.join(workdir, "track.m4a"))
+    timeline = build_timeline(sentences, [clip.duration for clip in audio],
+                              prepare_images(synthetic_images(args.images), background_size(PROFILES["full"].size)),
+                              "en")
+    rows, baseline = [], None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        render_video(timeline, os.path.join(workdir, f"out_{workers}.mp4"), track, workdir, workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        rows.append({
+            "workers": workers,
+            "wall_s": round(elapsed, 2),
+            "render_fps": round(timeline.total_frames / elapsed, 1),
+            "speedup": round(baseline / elapsed, 2),
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def bench_motion(args, workdir):
+    """Composes every frame of a full-size timeline per camera mode, without encoding."""
+    profile = PROFILES["full"]
+    sentences = synthetic_sentences(args.sentences)
+    durations = [3.0] * len(sentences)
+    images = synthetic_images(args.images)
+    rows = []
+
+    # Reference: what the MoviePy pipeline did for its static close-up, a
+    # full-frame LANCZOS resize of every frame followed by a centre crop.
+    frame = prepare_images(images[:1], profile.size)[0]
+    w, h = profile.size
+    zw, zh = round(w * ZOOM), round(h * ZOOM)
+    source = Image.fromarray(frame)
+    count = profile.fps * 5
+    start = time.perf_counter()
+    for _ in range(count):
+        zoomed = np.asarray(source.resize((zw, zh), Image.LANCZOS))
+        np.ascontiguousarray(zoomed[(zh - h) // 2:(zh - h) // 2 + h, (zw - w) // 2:(zw - w) // 2 + w])
+    elapsed = time.perf_counter() - start
+    rows.append({"camera": "per-frame resize (old)", "frames": count,
+                 "ms_per_frame": round(elapsed / count * 1000, 2), "compose_fps": round(count / elapsed, 1)})
+
+    for camera in CAMERAS:
+        frames = prepare_images(images, background_size(profile.size, camera))
+        timeline = build_timeline(sentences, durations, frames, "en", profile, camera=camera)
+        renderer = FrameRenderer(timeline)
+        start = time.perf_counter()
+        for index in range(timeline.total_frames):
+            renderer.render(index)
+        elapsed = time.perf_counter() - start
+        rows.append({"camera": camera, "frames": timeline.total_frames,
+                     "ms_per_frame": round(elapsed / timeline.total_frames * 1000, 2),
+                     "compose_fps": round(timeline.total_frames / elapsed, 1)})
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def _fresh_python(code, workdir, workers):
+    """Runs `code` in a new interpreter with an empty working directory and returns its stdout.
+
+    The caches all live under the working directory, so nothing carries over between runs.
+    """
+    run_dir = tempfile.mkdtemp(dir=workdir)
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)),
+               PRESSPLAY_RENDER_WORKERS=str(workers), PRESSPLAY_METRICS_DIR="")
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=run_dir, env=env,
+                            capture_output=True, text=True, check=True)
+    shutil.rmtree(run_dir, ignore_errors=True)
+    return result.stdout
+
+
+def import_seconds(module, workdir):
+    """Wall time of importing `module` into a fresh interpreter."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    return float(_fresh_python(code, workdir, 1))
+
+
+def render_latency(warm, sentence_count):
+    """Times two renders of different small releases in this process and prints them as JSON.
+
+    Run by the startup benchmark in a fresh interpreter, so the first render
+    pays every one-off cost that a warm-up (if `warm`) doesn't take first.
+    """
+    timings = {}
+    executor = None
+    if warm:
+        start = time.perf_counter()
+        pipeline.warm_up(["en"])
+        executor = start_render_pool()
+        timings["warm_up"] = time.perf_counter() - start
+    for run, name in enumerate(["first_render", "second_render"]):
+        sentences = [f"{sentence} ({name})" for sentence in synthetic_sentences(sentence_count)]
+        job = Job(name, tempfile.mkdtemp(dir="."))
+        start = time.perf_counter()
+        pipeline.generate_video(job, sentences, synthetic_images(2, size=(1600 + run, 1000)), "en",
+                                PROFILES["draft"], StubBackend(), executor=executor)
+        timings[name] = time.perf_counter() - start
+    if executor:
+        executor.shutdown()
+    print(json.dumps(timings))
+
+
+def bench_startup(args, workdir):
+    """App import time, and first-render latency with and without a warm render pool."""
+    rows = []
+    for module in ("streamlit", "app", "pipeline"):
+        times = [import_seconds(module, workdir) for _ in range(args.repeat)]
+        rows.append({"measure": f"import {module}", "workers": 1, "wall_s": round(statistics.median(times), 4)})
+    for warm in (False, True):
+        code = f"import bench; bench.render_latency({warm}, {args.sentences})"
+        runs = [json.loads(_fresh_python(code, workdir, args.workers)) for _ in range(args.repeat)]
+        for name in runs[0]:
+            rows.append({"measure": f"{name} ({'warm' if warm else 'cold'})", "workers": args.workers,
+                         "wall_s": round(statistics.median(run[name] for run in runs), 4)})
+    print_table(rows, ["measure", "workers", "wall_s"])
+    return rows
+
+
+def old_parse(text):
+    # Reference: the splitter before the segmenter, which knew only . ! ? and blank lines.
+    text = re.sub(r'(\.+|!|\?)(\s|(?=[\r\n]{2,}))', r'\1|', text)
+    text = re.sub(r'(\r\n|\n){2,}', '|', text)
+    return [s.strip() for s in text.split('|') if s.strip()]
+
+
+def bench_segment(args, workdir):
+    """Segments multi-megabyte releases: the old splitter, the streaming segmenter and full scene balancing."""
+    rows = []
+    for megabytes, lang_code in itertools.product(args.megabytes, args.languages):
+        release = synthetic_release(synthetic_sentences(2000, lang_code)) + "\n\n"
+        text = release * max(1, round(megabytes * 1024 * 1024 / len(release.encode("utf-8"))))
+        size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+        path = os.path.join(workdir, f"release_{lang_code}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        def from_file():
+            with open(path, encoding="utf-8") as f:
+                return list(iter_sentences(iter(lambda: f.read(64 * 1024), ""), lang_code))
+
+        runs = [
+            ("old splitter", lambda: old_parse(text)),
+            ("segmenter (string)", lambda: list(iter_sentences(text, lang_code))),
+            ("segmenter (64 KB chunks from file)", from_file),
+            ("segmenter + scene balancing",
+             lambda: [" ".join(scene.sentences) for scene in parse_text_to_scenes(text, lang_code)]),
+        ]
+        for name, run in runs:
+            start = time.perf_counter()
+            scenes = run()
+            elapsed = time.perf_counter() - start
+            rows.append({
+                "segmenter": name,
+                "language": lang_code,
+                "megabytes": round(size_mb, 1),
+                "scenes": len(scenes),
+                "longest_chars": max(len(scene) for scene in scenes),
+                "wall_s": round(elapsed, 3),
+                "mb_per_s": round(size_mb / elapsed, 2),
+            })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+def scene_segments(scenes):
+    """What each scene's encoded segment is made from, audio aside: its script and look, and the one it fades in over."""
+    looked = list(zip(scenes, scene_looks([scene.position for scene in scenes], EDIT_IMAGES)))
+    return [(looked[i - 1] if i else None, scene) for i, scene in enumerate(looked)]
+
+
+def changed_segments(before, after):
+    """How many scene segments of `after` have no identical segment in `before`, i.e. must be encoded again."""
+    remaining = collections.Counter(scene_segments(before))
+    changed = 0
+    for segment in scene_segments(after):
+        if remaining[segment]:
+            remaining[segment] -= 1
+        else:
+            changed += 1
+    return changed
+
+
+def bench_edits(args, workdir):
+    """Lengthens one sentence of a release at a time and counts the scenes that would be re-rendered.
+
+    Releases are laid out in paragraphs of four sentences, and as a single
+    paragraph, where only the anchor sentences limit how far merging reaches.
+    """
+    layouts = {"paragraphs": synthetic_release, "one paragraph": " ".join}
+    rows = []
+    for lang_code, (layout, join) in itertools.product(args.languages, layouts.items()):
+        sentences = synthetic_sentences(args.sentences, lang_code)
+        before = parse_text_to_scenes(join(sentences), lang_code)
+        counts = []
+        for index in random.Random(0).sample(range(len(sentences)), min(args.edits, len(sentences))):
+            edited = list(sentences)
+            # The kind of edit that regrouped nearly every scene before: one sentence grows by ~20 characters.
+            edited[index] = edited[index][:-1] + ", as announced on Monday" + edited[index][-1]
+            counts.append(changed_segments(before, parse_text_to_scenes(join(edited), lang_code)))
+        rows.append({
+            "language": lang_code,
+            "layout": layout,
+            "scenes": len(before),
+            "edits": len(counts),
+            "mean_changed": round(statistics.mean(counts), 2),
+            "max_changed": max(counts),
+            "passed": max(counts) <= MAX_CHANGED_SEGMENTS,
+        })
+    print_table(rows, list(rows[0]))
+    return rows
+
+
+BENCHMARKS = {
+    "pipeline": bench_pipeline,
+    "profiles": bench_profiles,
+    "workers": bench_workers,
+    "motion": bench_motion,
+    "startup": bench_startup,
+    "segment": bench_segment,
+    "edits": bench_edits,
+}
+
+
+# --- Regression check ---
+
+def row_id(row):
+    return tuple(sorted((key, str(value)) for key, value in row.items() if key not in METRICS))
+
+
+def compare(baseline, current, threshold):
+    """Returns one entry per metric that got worse by more than `threshold` (a fraction)."""
+    if baseline["benchmark"] != current["benchmark"]:
+        raise ValueError(f"Can't compare a {baseline['benchmark']!r} run with a {current['benchmark']!r} run")
+    old_rows = {row_id(row): row for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = old_rows.get(row_id(row))
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in row or metric not in old or not old[metric]:
+                continue
+            delta = row[metric] - old[metric]
+            worse = -delta if higher_is_better else delta
+            if worse > MIN_DELTA[metric] and worse / abs(old[metric]) > threshold:
+                regressions.append({
+                    "row": {key: value for key, value in row.items() if key not in METRICS},
+                    "metric": metric,
+                    "baseline": old[metric],
+                    "current": row[metric],
+                    "change": f"{delta / abs(old[metric]):+.0%}",
+                })
+    return regressions
+
+
+def main_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    try:
+        regressions = compare(baseline, current, args.threshold)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    unmatched = len({row_id(row) for row in current["results"]} - {row_id(row) for row in baseline["results"]})
+    if unmatched:
+        print(f"{unmatched} result(s) have no counterpart in the baseline and were not compared.")
+    if not regressions:
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}.")
+        return 0
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%} against {args.baseline}:")
+    print_table([dict(entry, row=" ".join(f"{k}={v}" for k, v in entry["row"].items()))
+                 for entry in regressions], ["row", "metric", "baseline", "current", "change"])
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PressPlay AI video pipeline.")
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--images", type=int, default=3)
+    common.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="render worker processes")
+    common.add_argument("--json", help="also write the results to this JSON file")
+
+    pipeline = commands.add_parser("pipeline", parents=[common],
+                                   help="wall time and peak RSS of every pipeline stage")
+    pipeline.add_argument("--sizes", type=lambda v: parse_list(v, int), default=[5, 20, 50, 100, 200],
+                          help="comma-separated sentence counts")
+    pipeline.add_argument("--image-counts", type=lambda v: parse_list(v, int),
+                          help="comma-separated image counts (default: --images)")
+    pipeline.add_argument("--languages", type=parse_list, default=["en"],
+                          help="comma-separated language codes")
+    pipeline.add_argument("--profile", choices=sorted(PROFILES), default="full")
+    for name in ("profiles", "workers", "motion"):
+        command = commands.add_parser(name, parents=[common])
+        command.add_argument("--sentences", type=int, default=30)
+    startup = commands.add_parser("startup", parents=[common],
+                                  help="app import time and first-render latency, cold and warm")
+    startup.add_argument("--sentences", type=int, default=4)
+    startup.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+
+    segment = commands.add_parser("segment", parents=[common], help="sentence segmenter throughput")
+    segment.add_argument("--megabytes", type=lambda v: parse_list(v, float), default=[1, 4, 16],
+                         help="comma-separated release sizes")
+    segment.add_argument("--languages", type=parse_list, default=["en", "hi", "ur"],
+                         help="comma-separated language codes")
+
+    edits = commands.add_parser("edits", parents=[common], help="scenes re-rendered after a one-sentence edit")
+    edits.add_argument("--sentences", type=int, default=200)
+    edits.add_argument("--edits", type=int, default=50, help="sentences edited, one at a time")
+    edits.add_argument("--languages", type=parse_list, default=["en", "hi", "ur"],
+                       help="comma-separated language codes")
+
+    check = commands.add_parser("compare", help="flag regressions against a stored baseline")
+    check.add_argument("baseline", help="JSON written by an earlier --json run")
+    check.add_argument("current", help="JSON written by this run")
+    check.add_argument("--threshold", type=float, default=0.15,
+                       help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.benchmark == "compare":
+        return main_compare(args)
+    if args.benchmark == "pipeline":
+        args.image_counts = args.image_counts or [args.images]
+
+    workdir = tempfile.mkdtemp(prefix="pressplay-bench-")
+    try:
+        rows = BENCHMARKS[args.benchmark](args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": args.benchmark, "environment": environment(), "results": rows},
+                      f, indent=2, ensure_ascii=False)
+    return 1 if any(row.get("passed") is False for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
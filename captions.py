@@ -0,0 +1,233 @@
+import functools
+import os
+import unicodedata
+import warnings
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, features
+
+from storage import BytesLRU
+
+CAPTION_WIDTH = 1200
+FONT_SIZE = 36
+PADDING = (20, 12) # Horizontal, vertical padding inside the box
+LINE_SPACING = 6
+BOX_COLOR = (0, 0, 0, 153) # rgba(0, 0, 0, 0.6)
+TEXT_COLOR = (255, 255, 255, 255)
+CAPTION_TOP = 0.8 # Top edge of the caption, as a fraction of the frame height
+DEFAULT_MAX_BYTES = int(os.environ.get("PRESSPLAY_CAPTION_CACHE_MB", "256")) * 1024 * 1024
+
+# --- Fonts ---
+# Bold font files tried in order for each script; the first one Pillow can
+# load wins. Bare file names are looked up in the system font folders, and
+# PRESSPLAY_FONT_DIR (if set) is searched first.
+SCRIPT_FONTS = {
+    "latin": ["arialbd.ttf", "Arial Bold.ttf", "NotoSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+    "devanagari": ["NotoSansDevanagari-Bold.ttf", "Lohit-Devanagari.ttf", "nirmalab.ttf"],
+    "bengali": ["NotoSansBengali-Bold.ttf", "Lohit-Bengali.ttf", "nirmalab.ttf"],
+    "tamil": ["NotoSansTamil-Bold.ttf", "Lohit-Tamil.ttf", "nirmalab.ttf"],
+    "telugu": ["NotoSansTelugu-Bold.ttf", "Lohit-Telugu.ttf", "nirmalab.ttf"],
+    "kannada": ["NotoSansKannada-Bold.ttf", "Lohit-Kannada.ttf", "nirmalab.ttf"],
+    "gujarati": ["NotoSansGujarati-Bold.ttf", "Lohit-Gujarati.ttf", "nirmalab.ttf"],
+    "malayalam": ["NotoSansMalayalam-Bold.ttf", "Lohit-Malayalam.ttf", "nirmalab.ttf"],
+    "gurmukhi": ["NotoSansGurmukhi-Bold.ttf", "Lohit-Gurmukhi.ttf", "nirmalab.ttf"],
+    "oriya": ["NotoSansOriya-Bold.ttf", "Lohit-Odia.ttf", "nirmalab.ttf"],
+    "arabic": ["NotoNastaliqUrdu-Bold.ttf", "NotoNaskhArabic-Bold.ttf", "arialbd.ttf"],
+}
+
+LANG_SCRIPTS = {
+    "en": "latin",
+    "hi": "devanagari",
+    "mr": "devanagari",
+    "bn": "bengali",
+    "ta": "tamil",
+    "te": "telugu",
+    "kn": "kannada",
+    "gu": "gujarati",
+    "ml": "malayalam",
+    "pa": "gurmukhi",
+    "or": "oriya",
+    "ur": "arabic",
+}
+
+RTL_LANGS = {"ur"}
+
+# Indic conjuncts and Urdu joining only come out right with the Raqm layout
+# engine (HarfBuzz + FriBiDi); the basic engine draws unshaped glyphs.
+HAS_RAQM = features.check("raqm")
+
+
+@functools.lru_cache(maxsize=None)
+def find_font_file(script):
+    """Returns the first loadable font file for a script, or None."""
+    candidates = SCRIPT_FONTS.get(script, []) + SCRIPT_FONTS["latin"]
+    font_dir = os.environ.get("PRESSPLAY_FONT_DIR")
+    if font_dir:
+        candidates = [os.path.join(font_dir, name) for name in candidates] + candidates
+    for name in candidates:
+        try:
+            ImageFont.truetype(name, FONT_SIZE)
+            return name
+        except OSError:
+            continue
+    return None
+
+
+@functools.lru_cache(maxsize=64)
+def get_font(lang_code, size=FONT_SIZE):
+    """Returns the (memoized) bold font for a language at the given size."""
+    script = LANG_SCRIPTS.get(lang_code, "latin")
+    if script != "latin" and not HAS_RAQM:
+        warnings.warn(f"Pillow was built without Raqm; '{lang_code}' captions will not be shaped correctly.")
+    path = find_font_file(script)
+    if path is None:
+        warnings.warn(f"No font found for the '{script}' script; using Pillow's default font.")
+        return ImageFont.load_default(size)
+    layout = ImageFont.Layout.RAQM if HAS_RAQM else ImageFont.Layout.BASIC
+    return ImageFont.truetype(path, size, layout_engine=layout)
+
+
+# --- Layout ---
+
+def _text_options(lang_code):
+    """Keyword arguments for Pillow's text calls; direction/language need Raqm."""
+    if not HAS_RAQM:
+        return {}
+    return {"direction": "rtl" if lang_code in RTL_LANGS else "ltr", "language": lang_code}
+
+
+def _split_word(word, font, max_width, options):
+    """Breaks a word wider than a line, never separating a combining mark from its base."""
+    pieces, current = [], ""
+    for ch in word:
+        if current and not unicodedata.category(ch).startswith("M") \
+                and font.getlength(current + ch, **options) > max_width:
+            pieces.append(current)
+            current = ch
+        else:
+            current += ch
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def wrap_text(text, font, max_width, lang_code="en"):
+    """Greedily wraps text on spaces so each line fits in max_width pixels."""
+    options = _text_options(lang_code)
+    lines, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if font.getlength(candidate, **options) <= max_width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        if font.getlength(word, **options) <= max_width:
+            current = word
+        else:
+            *full, current = _split_word(word, font, max_width, options)
+            lines.extend(full)
+    if current:
+        lines.append(current)
+    return lines
+
+
+# --- Rendering ---
+
+def _render(text, lang_code, font_size, width):
+    font = get_font(lang_code, font_size)
+    options = _text_options(lang_code)
+    lines = wrap_text(text, font, width - 2 * PADDING[0], lang_code) or [""]
+
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    height = 2 * PADDING[1] + len(lines) * line_height + (len(lines) - 1) * LINE_SPACING
+
+    img = Image.new("RGBA", (width, height), BOX_COLOR)
+    draw = ImageDraw.Draw(img)
+    y = PADDING[1]
+    for line in lines:
+        draw.text((width / 2, y), line, font=font, fill=TEXT_COLOR, anchor="ma", **options)
+        y += line_height + LINE_SPACING
+
+    caption = np.asarray(img, dtype=np.uint8)
+    caption.flags.writeable = False # Shared through the cache
+    return caption
+
+
+class CaptionCache(BytesLRU):
+    """LRU of caption rasters keyed by (text, language, font size, width), bounded in bytes.
+
+    A full-width raster is 0.3-0.7 MB depending on its line count, so the
+    bound is on their size rather than on how many there are; the default
+    holds every caption of a few hundred scenes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(max_bytes)
+
+    def get(self, text, lang_code, font_size, width):
+        """Returns the raster for a caption, drawing it only if it isn't cached."""
+        return self.get_or_build((text, lang_code, font_size, width),
+                                 lambda: _render(text, lang_code, font_size, width))
+
+
+# Shared by every session in the process.
+caption_cache = CaptionCache()
+
+
+def render_caption(text, lang_code="en", font_size=FONT_SIZE, width=CAPTION_WIDTH):
+    """Returns the caption for a sentence as an RGBA array (text over the translucent box).
+
+    Rasters are memoized per (text, language/font, size, width), so repeated
+    sentences and re-renders skip layout and drawing entirely.
+    """
+    return caption_cache.get(text, lang_code, font_size, width)
+
+
+def caption_position(caption, frame_size):
+    """Top-left corner that centres the caption horizontally at CAPTION_TOP, kept inside the frame."""
+    frame_w, frame_h = frame_size
+    h, w = caption.shape[:2]
+    x = (frame_w - w) // 2
+    y = max(0, min(int(frame_h * CAPTION_TOP), frame_h - h))
+    return x, y
+
+
+if __name__ == "__main__":
+    # Quick benchmark: rasterize every sentence of a long synthetic release.
+    import time
+
+    sentences = [
+        f"Sentence {i}: The Union Cabinet has approved a landmark scheme that aims to empower millions of citizens."
+        for i in range(200)
+    ]
+    start = time.perf_counter()
+    for sentence in sentences:
+        render_caption(sentence)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for sentence in sentences:
+        render_caption(sentence)
+    warm = time.perf_counter() - start
+    print(f"Raqm layout: {HAS_RAQM}")
+    print(f"{len(sentences)} captions: cold {cold * 1000:.1f} ms ({cold / len(sentences) * 1000:.2f} ms each), "
+          f"cached {warm * 1000:.2f} ms, {caption_cache.current_bytes / 2**20:.1f} MB held")
+
+    # The same sentences through MoviePy's ImageMagick captions, which the app used before.
+    try:
+        from moviepy.editor import TextClip
+    except ImportError:
+        print("MoviePy is not installed; skipping the TextClip comparison.")
+    else:
+        start = time.perf_counter()
+        try:
+            for sentence in sentences:
+                TextClip(sentence, font="Arial-Bold", fontsize=FONT_SIZE, color="white",
+                         bg_color="rgba(0, 0, 0, 0.6)", size=(CAPTION_WIDTH, None), method="caption").close()
+        except OSError:
+            print("TextClip failed; ImageMagick is probably not installed. Skipping the comparison.")
+        else:
+            textclip = time.perf_counter() - start
+            print(f"{len(sentences)} TextClips: {textclip * 1000:.1f} ms ({textclip / len(sentences) * 1000:.2f} ms each), "
+                  f"{textclip / cold:.1f}x the cold time above")
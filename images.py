@@ -0,0 +1,146 @@
+import hashlib
+import io
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from storage import BytesLRU
+
+try:
+    import cv2
+    RESAMPLER = "cv2" # warpAffine straight into the output buffer, several times faster than Pillow
+except ImportError:
+    cv2 = None
+    RESAMPLER = "pillow"
+
+OUTPUT_SIZE = (1280, 720)
+OVERSAMPLE = 1.2 # Moving cameras cut their frames from bases this much larger than the output
+# The largest frame any render needs: the oversampled base of a full-size
+# render. Uploads are decoded once at this size and every smaller size is
+# scaled from it.
+DECODE_SIZE = (round(OUTPUT_SIZE[0] * OVERSAMPLE), round(OUTPUT_SIZE[1] * OVERSAMPLE))
+DEFAULT_MAX_BYTES = int(os.environ.get("PRESSPLAY_FRAME_CACHE_MB", "512")) * 1024 * 1024
+
+
+def content_hash(data):
+    """Returns the SHA-256 hex digest of an uploaded file's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare_frame(data, size=OUTPUT_SIZE):
+    """Decodes image bytes once, centre-crops and scales them to `size`, as an RGB array."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img = ImageOps.fit(img, size, Image.LANCZOS, centering=(0.5, 0.5))
+    frame = np.asarray(img, dtype=np.uint8)
+    # Frames are shared between scenes, sessions and jobs, so nobody may write to them.
+    frame.flags.writeable = False
+    return frame
+
+
+def scale_frame(frame, size):
+    """Centre-crops and scales an already prepared frame to another size."""
+    scaled = np.asarray(ImageOps.fit(Image.fromarray(frame), size, Image.LANCZOS, centering=(0.5, 0.5)))
+    scaled.flags.writeable = False
+    return scaled
+
+
+class FrameCache(BytesLRU):
+    """LRU of prepared frames keyed by (image content hash, size), bounded in bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(max_bytes)
+
+    def get(self, data, size=OUTPUT_SIZE):
+        """Returns the prepared frame for `data`, decoding it only if it isn't cached.
+
+        Each upload is decoded once, at DECODE_SIZE, and smaller sizes (draft
+        renders, static cameras) are scaled from that frame, so a draft
+        followed by a full render still decodes each upload once. Only sizes
+        beyond DECODE_SIZE are decoded directly.
+        """
+        if tuple(size) == DECODE_SIZE or size[0] > DECODE_SIZE[0]:
+            build = lambda: prepare_frame(data, size)
+        else:
+            build = lambda: scale_frame(self.get(data, DECODE_SIZE), size)
+        return self.get_or_build((content_hash(data), tuple(size)), build)
+
+
+# Shared by every session in the process, so a logo uploaded by many jobs is prepared once.
+frame_cache = FrameCache()
+
+
+def prepare_images(images, size=OUTPUT_SIZE, cache=None):
+    """Returns one prepared frame per image (bytes), in order."""
+    cache = cache or frame_cache
+    return [cache.get(data, size) for data in images]
+
+
+def zoom_frame(frame, zoom):
+    """Returns a centred `zoom`x close-up of a prepared frame at the same size."""
+    if zoom == 1.0:
+        return frame
+    h, w = frame.shape[:2]
+    crop_w, crop_h = w / zoom, h / zoom
+    box = ((w - crop_w) / 2, (h - crop_h) / 2, (w + crop_w) / 2, (h + crop_h) / 2)
+    zoomed = np.asarray(Image.fromarray(frame).resize((w, h), Image.LANCZOS, box=box))
+    zoomed.flags.writeable = False
+    return zoomed
+
+
+class WindowSampler:
+    """Resamples crop windows of base frames into a reused output-sized buffer.
+
+    A window exactly the output size (a pan) is cut by slicing and shifted
+    by a sub-pixel amount with a two-tap blend, on a 0-256 weight scale like
+    the crossfades. Any other window (a zoom) is resampled with OpenCV when
+    it's installed, and with Pillow otherwise.
+    """
+
+    def __init__(self, size):
+        w, h = size
+        self.size = size
+        self._acc = np.empty((h + 1, w, 3), np.uint16)
+        self._acc2 = np.empty((h + 1, w, 3), np.uint16)
+        self._images = {} # id(base) -> (base, PIL image), for the Pillow path
+
+    def sample(self, base, window, out):
+        """Fills `out` with the window (left, top, right, bottom; floats, base pixels) of `base`."""
+        left, top, right, bottom = window
+        w, h = self.size
+        if abs(right - left - w) < 1e-6 and abs(bottom - top - h) < 1e-6:
+            self._shift(base, left, top, out)
+        elif cv2 is not None:
+            sx, sy = (right - left) / w, (bottom - top) / h
+            matrix = np.array([[sx, 0, left + 0.5 * sx - 0.5], [0, sy, top + 0.5 * sy - 0.5]])
+            cv2.warpAffine(base, matrix, (w, h), dst=out, flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                           borderMode=cv2.BORDER_REPLICATE)
+        else:
+            entry = self._images.get(id(base))
+            if entry is None:
+                entry = self._images[id(base)] = (base, Image.fromarray(base))
+            np.copyto(out, np.asarray(entry[1].resize((w, h), Image.BILINEAR, box=window)))
+        return out
+
+    def _shift(self, base, left, top, out):
+        w, h = self.size
+        x, ax = divmod(round(left * 256), 256)
+        y, ay = divmod(round(top * 256), 256)
+        rows = h + (ay > 0)
+        src = base[y:y + rows, x:x + w + (ax > 0)]
+        if ax:
+            acc, acc2 = self._acc[:rows], self._acc2[:rows]
+            np.multiply(src[:, :w], np.uint16(256 - ax), out=acc)
+            np.multiply(src[:, 1:], np.uint16(ax), out=acc2)
+            acc += acc2
+            acc >>= 8
+            src = acc
+        if ay:
+            acc, acc2 = self._acc[:h], self._acc2[:h]
+            np.multiply(src[1:], np.uint16(ay), out=acc2)
+            np.multiply(src[:h], np.uint16(256 - ay), out=acc) # May overwrite src[:h]; src[1:] is already read
+            acc += acc2
+            acc >>= 8
+            src = acc
+        np.copyto(out, src, casting="unsafe")
@@ -0,0 +1,145 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_WORKERS = int(os.environ.get("PRESSPLAY_JOB_WORKERS", "2"))
+JOBS_ROOT = os.environ.get("PRESSPLAY_JOBS_DIR", os.path.join(tempfile.gettempdir(), "pressplay-jobs"))
+JOB_TTL = 60 * 60 # Seconds a finished job's workspace is kept around
+
+log = logging.getLogger("pressplay.jobs")
+
+
+class Job:
+    """One queued render: its state, progress and private working directory."""
+
+    def __init__(self, job_id, workdir):
+        self.id = job_id
+        self.workdir = workdir
+        self.state = QUEUED
+        self.stage = None
+        self.progress = 0.0 # Fraction of the current stage
+        self.frames = None # (done, total) while frames are being rendered
+        self.artifacts = {} # Intermediate outputs the UI can show early, e.g. the audio track
+        self.result = None
+        self.error = None
+        self.timings = {} # Seconds spent in each finished stage
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._stage_started = None
+        self._lock = threading.Lock()
+
+    def _close_stage(self):
+        # Caller holds the lock.
+        if self.stage is not None and self._stage_started is not None:
+            self.timings[self.stage] = time.perf_counter() - self._stage_started
+            self._stage_started = None
+
+    def report(self, stage=None, progress=None, frames=None, **artifacts):
+        """Called by the running pipeline to publish its stage, progress and outputs."""
+        with self._lock:
+            if stage is not None and stage != self.stage:
+                self._close_stage()
+                self.stage = stage
+                self._stage_started = time.perf_counter()
+                self.progress = 0.0
+                self.frames = None
+            if progress is not None:
+                self.progress = progress
+            if frames is not None:
+                self.frames = frames
+            self.artifacts.update(artifacts)
+
+    def snapshot(self):
+        """Returns a consistent copy of the job's public state."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "state": self.state,
+                "stage": self.stage,
+                "progress": self.progress,
+                "frames": self.frames,
+                "artifacts": dict(self.artifacts),
+                "result": self.result,
+                "error": self.error,
+                "timings": dict(self.timings),
+            }
+
+    @property
+    def is_finished(self):
+        return self.state in (DONE, FAILED)
+
+
+class JobQueue:
+    """In-process job runner with a bounded worker pool and one workspace per job.
+
+    `fn(job, *args, **kwargs)` runs on a worker thread; it writes only inside
+    `job.workdir`, reports progress through `job.report` and returns the result.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, root=JOBS_ROOT, ttl=JOB_TTL):
+        self.root = root
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="render-job")
+        os.makedirs(root, exist_ok=True)
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues a job and returns its ID."""
+        self.prune()
+        job_id = uuid.uuid4().hex
+        job = Job(job_id, tempfile.mkdtemp(prefix=f"{job_id}-", dir=self.root))
+        with self._lock:
+            self._jobs[job_id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        job.started = time.time()
+        job.state = RUNNING
+        result, error = None, None
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            log.exception("Job %s failed", job.id)
+            error = str(e) or type(e).__name__
+        # Publish everything before the state flips, so a poller that sees
+        # the job finished also sees its result and complete timings.
+        with job._lock:
+            job._close_stage()
+            job.result = result
+            job.error = error
+            job.finished = time.time()
+            job.state = FAILED if error is not None else DONE
+
+    def discard(self, job_id):
+        """Forgets a finished job and deletes its workspace."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.is_finished:
+                return
+            del self._jobs[job_id]
+        shutil.rmtree(job.workdir, ignore_errors=True)
+
+    def prune(self):
+        """Discards finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job.id for job in self._jobs.values() if job.finished and job.finished < cutoff]
+        for job_id in expired:
+            self.discard(job_id)
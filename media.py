@@ -0,0 +1,79 @@
+import functools
+import os
+import subprocess
+import wave
+
+SAMPLE_RATE = 44100 # Of every audio track the app builds
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_exe():
+    """Returns the ffmpeg binary bundled with imageio-ffmpeg, falling back to the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return os.environ.get("IMAGEIO_FFMPEG_EXE", "ffmpeg")
+
+
+def run_ffmpeg(args):
+    """Runs ffmpeg quietly and raises with its stderr if it fails."""
+    result = subprocess.run(
+        [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"] + list(args),
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return result
+
+
+def audio_duration(path):
+    """Returns the exact playback length of an audio file in seconds."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+    # Compressed formats only carry an estimate in their header, so decode
+    # to 16 kHz mono PCM and count the samples instead.
+    result = run_ffmpeg(["-i", path, "-f", "s16le", "-ac", "1", "-ar", "16000", "-"])
+    return len(result.stdout) / (2 * 16000.0)
+
+
+def build_audio_track(paths, slot_durations, out_path):
+    """Joins sentence clips into one AAC track, padding each slot with silence to fill it.
+
+    Slots are the scenes' frame-rounded lengths, so the track lines up with
+    the video frame for frame no matter how many sentences there are. An
+    entry of `paths` may also be a list of clips, played one after another
+    in the same slot (a scene that speaks several sentences).
+    """
+    args, filters, count = [], [], 0
+    for i, (clips, slot) in enumerate(zip(paths, slot_durations)):
+        clips = [clips] if isinstance(clips, str) else list(clips)
+        labels = ""
+        for clip in clips:
+            args += ["-i", clip]
+            filters.append(
+                f"[{count}:a]aformat=sample_fmts=fltp:sample_rates={SAMPLE_RATE}:channel_layouts=mono[c{count}]"
+            )
+            labels += f"[c{count}]"
+            count += 1
+        joined = f"{labels}concat=n={len(clips)}:v=0:a=1," if len(clips) > 1 else labels
+        filters.append(f"{joined}apad=whole_dur={slot:.6f},atrim=duration={slot:.6f}[a{i}]")
+    inputs = "".join(f"[a{i}]" for i in range(len(slot_durations)))
+    graph = ";".join(filters) + f";{inputs}concat=n={len(slot_durations)}:v=0:a=1[out]"
+    run_ffmpeg(args + ["-filter_complex", graph, "-map", "[out]", "-c:a", "aac", "-b:a", "128k", out_path])
+    return out_path
+
+
+def audio_slice_args(path, start_sample, end_sample):
+    """ffmpeg input and filter arguments for samples [start_sample, end_sample) of a track, to the sample.
+
+    Seeks the input to a whole second before the slice, where seeking is
+    exact, and trims from there, so the slice has to be re-encoded.
+    """
+    seek = max(0, start_sample // SAMPLE_RATE - 1)
+    offset = seek * SAMPLE_RATE
+    # "-ss 0" keeps the encoder priming that the demuxer otherwise drops, so only seek when it's needed.
+    args = ["-ss", str(seek)] if seek else []
+    trim = f"atrim=start_sample={start_sample - offset}:end_sample={end_sample - offset},asetpts=PTS-STARTPTS"
+    return args + ["-i", path], trim
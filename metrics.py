@@ -0,0 +1,303 @@
+"""Always-on pipeline metrics: stage timers, per-frame timing and counters.
+
+Every finished run is written as one JSON line to the event log and folded
+into a process-wide registry, which is exported in the Prometheus text
+format to a file (for node_exporter's textfile collector) and, when
+PRESSPLAY_METRICS_PORT is set, served over HTTP at /metrics.
+"""
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from storage import atomic_write
+
+log = logging.getLogger("pressplay.metrics")
+
+# Set PRESSPLAY_METRICS_DIR to an empty string to turn off the event log and the text file.
+METRICS_DIR = os.environ.get("PRESSPLAY_METRICS_DIR", os.path.join(".cache", "metrics"))
+EVENT_LOG = "events.jsonl"
+TEXTFILE = "pressplay.prom"
+PREFIX = "pressplay_"
+
+STAGE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Seconds to compute one frame; at 24 fps the whole frame budget is ~0.042.
+FRAME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+# --- Frame timing ---
+
+class FrameStats:
+    """Per-frame timing of an encode, split into computing frames and writing them to ffmpeg.
+
+    Time spent writing is time the encoder is behind, so a high write share
+    means x264 is the bottleneck and a high render share means the blending
+    is. Plain attributes, so it pickles back from render worker processes.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.repeated = 0 # Frames identical to the one before, not recomputed
+        self.render_s = 0.0
+        self.write_s = 0.0
+        self.slowest = 0.0
+        self.buckets = [0] * (len(FRAME_BUCKETS) + 1)
+
+    def add(self, render_s, write_s):
+        self.frames += 1
+        self.render_s += render_s
+        self.write_s += write_s
+        if render_s > self.slowest:
+            self.slowest = render_s
+        self.buckets[bisect.bisect_left(FRAME_BUCKETS, render_s)] += 1
+
+    def merge(self, other):
+        self.frames += other.frames
+        self.repeated += other.repeated
+        self.render_s += other.render_s
+        self.write_s += other.write_s
+        self.slowest = max(self.slowest, other.slowest)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        return self
+
+    def summary(self):
+        return {
+            "frames": self.frames,
+            "repeated": self.repeated,
+            "render_s": round(self.render_s, 4),
+            "write_s": round(self.write_s, 4),
+            "mean_render_ms": round(self.render_s / self.frames * 1000, 3) if self.frames else 0.0,
+            "slowest_render_ms": round(self.slowest * 1000, 3),
+        }
+
+
+# --- Registry ---
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """Thread-safe counters and histograms, rendered in the Prometheus text format.
+
+    Collectors are callables returning (name, type, help, value, labels)
+    tuples; they export state that lives elsewhere, like cache hit counts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {} # name -> (type, help, {labels: value})
+        self._collectors = []
+
+    def _series(self, name, kind, help):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = (kind, help, {})
+        return metric[2]
+
+    def inc(self, name, value=1, help="", **labels):
+        with self._lock:
+            series = self._series(name, "counter", help)
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, buckets, help="", **labels):
+        counts = [0] * (len(buckets) + 1)
+        counts[bisect.bisect_left(buckets, value)] = 1
+        self.observe_counts(name, buckets, counts, value, help, **labels)
+
+    def observe_counts(self, name, buckets, counts, total, help="", **labels):
+        """Adds pre-bucketed observations (e.g. a FrameStats) to a histogram."""
+        with self._lock:
+            series = self._series(name, "histogram", help)
+            key = _labels(labels)
+            hist = series.setdefault(key, {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0})
+            hist["counts"] = [a + b for a, b in zip(hist["counts"], counts)]
+            hist["sum"] += total
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """The registry and every collector, in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = {name: (kind, help, dict(series)) for name, (kind, help, series) in self._metrics.items()}
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                log.warning("Metrics collector %r failed: %s", collector, e)
+                continue
+            for name, kind, help, value, labels in samples:
+                metrics.setdefault(name, (kind, help, {}))[2][_labels(labels)] = value
+        for name, (kind, help, series) in sorted(metrics.items()):
+            full_name = PREFIX + name
+            lines.append(f"# HELP {full_name} {help}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in sorted(series.items()):
+                if kind != "histogram":
+                    lines.append(f"{full_name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(value["buckets"]) + ["+Inf"], value["counts"]):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {value['sum']}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# --- Export ---
+
+_event_log_lock = threading.Lock()
+_event_log_ready = False
+
+
+def _event_log():
+    """Attaches the JSON-lines file handler to the metrics logger, once."""
+    global _event_log_ready
+    with _event_log_lock:
+        if not _event_log_ready and METRICS_DIR:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            handler = logging.FileHandler(os.path.join(METRICS_DIR, EVENT_LOG), encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            log.addHandler(handler)
+            log.setLevel(logging.INFO)
+        _event_log_ready = True
+    return log
+
+
+def write_textfile(path=None):
+    """Atomically writes the registry to a Prometheus text file; returns its path."""
+    if path is None:
+        if not METRICS_DIR:
+            return None
+        path = os.path.join(METRICS_DIR, TEXTFILE)
+    atomic_write(path, registry.render())
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0"):
+    """Serves the registry at http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# --- Runs ---
+
+class RunMetrics:
+    """Stage timings and counters for one pipeline run.
+
+    Use as a context manager: on exit the run is published to the registry,
+    the event log and the text file, as failed if an exception escaped.
+    """
+
+    def __init__(self, run_id, **labels):
+        self.run_id = run_id
+        self.labels = labels
+        self.stages = {}
+        self.counters = {}
+        self.frames = FrameStats()
+        self.status = None
+        self.total_s = None
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times a block as one pipeline stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        return {
+            "run": self.run_id,
+            "status": self.status,
+            "labels": self.labels,
+            "total_s": round(self.total_s if self.total_s is not None else time.perf_counter() - self._started, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "frames": self.frames.summary(),
+        }
+
+    def finish(self, status="ok"):
+        """Publishes the run once and returns its summary."""
+        if self.status is not None:
+            return self.summary()
+        self.status = status
+        self.total_s = time.perf_counter() - self._started
+
+        registry.inc("runs_total", help="Pipeline runs by outcome", status=status, **self.labels)
+        registry.observe("run_seconds", self.total_s, STAGE_BUCKETS, help="Wall time of a whole run",
+                         **self.labels)
+        for name, seconds in self.stages.items():
+            registry.observe("stage_seconds", seconds, STAGE_BUCKETS, help="Wall time per pipeline stage",
+                             stage=name, **self.labels)
+        for name, value in self.counters.items():
+            registry.inc(f"{name}_total", value, help=f"Total {name.replace('_', ' ')}")
+        if self.frames.frames:
+            registry.observe_counts("frame_render_seconds", FRAME_BUCKETS, self.frames.buckets,
+                                    self.frames.render_s, help="Time to compute one video frame")
+            registry.inc("frame_write_seconds_total", self.frames.write_s,
+                         help="Time spent waiting on the encoder's input pipe")
+            registry.inc("frames_repeated_total", self.frames.repeated,
+                         help="Frames identical to the previous one, not recomputed")
+
+        summary = self.summary()
+        try:
+            _event_log().info(json.dumps(dict(summary, event="run", time=time.time()), ensure_ascii=False))
+            write_textfile()
+        except OSError as e:
+            log.warning("Could not export metrics: %s", e)
+        return summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish("failed" if exc_type else "ok")
+        return False
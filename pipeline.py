@@ -0,0 +1,224 @@
+import functools
+import logging
+import os
+import time
+
+import captions
+from captions import FONT_SIZE, LANG_SCRIPTS, find_font_file
+from images import RESAMPLER, content_hash, frame_cache
+from media import ffmpeg_exe
+from metrics import RunMetrics, registry
+from render import (CROSSFADE, DEFAULT_CAMERA, DEFAULT_PROFILE, MOTIONS, OVERSAMPLE, RENDER_WORKERS, ZOOM,
+                    background_size, build_timeline, render_audio_track, render_video, scene_duration)
+from render_cache import SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES, RenderCache, render_key
+from streaming import HLSWriter
+from text_processing import SceneScript
+from tts import GTTSBackend, audio_cache, synthesize_sentences
+
+# Stage labels, in order, as shown in the UI.
+STAGE_IMAGES = "Step 1/4: Loading images..."
+STAGE_AUDIO = "Step 2/4: Generating audio..."
+STAGE_SCENES = "Step 3/4: Creating video scenes..."
+STAGE_RENDER = "Step 4/4: Rendering final video..."
+STAGES = [STAGE_IMAGES, STAGE_AUDIO, STAGE_SCENES, STAGE_RENDER]
+
+log = logging.getLogger("pressplay.pipeline")
+
+
+def load_images(images, size):
+    """Decodes image bytes into prepared frames, skipping files that can't be read.
+
+    Returns the frames and a message for each skipped file, for the UI.
+    """
+    frames, skipped = [], []
+    for number, data in enumerate(images, 1):
+        try:
+            # Cached by content hash, so re-uploads and repeats are decoded only once
+            frames.append(frame_cache.get(data, size))
+        except Exception as e:
+            log.warning("Skipping unreadable image %d: %s", number, e)
+            skipped.append(f"Skipped image {number}: it is not an image file that could be read.")
+    if not frames:
+        raise ValueError("Could not load uploaded images. Please try again.")
+    return frames, skipped
+
+
+@functools.lru_cache(maxsize=None)
+def default_render_cache():
+    """The on-disk cache of finished videos shared by every job in the process."""
+    return RenderCache()
+
+
+@functools.lru_cache(maxsize=None)
+def default_segment_cache():
+    """The on-disk cache of encoded per-scene segments, reused across edits of a script."""
+    return RenderCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES)
+
+
+def cache_metrics():
+    """Hit and miss counts of the process-wide caches, for the metrics registry."""
+    caches = [
+        ("frames", frame_cache.hits, frame_cache.misses),
+        ("tts", audio_cache.hits, audio_cache.misses),
+        ("captions", captions.caption_cache.hits, captions.caption_cache.misses),
+    ]
+    for name, cache in (("renders", default_render_cache()), ("segments", default_segment_cache())):
+        stats = cache.stats()
+        caches.append((name, stats["hits"], stats["misses"]))
+    for name, hits, misses in caches:
+        yield ("cache_hits_total", "counter", "Cache lookups that were hits", hits, {"cache": name})
+        yield ("cache_misses_total", "counter", "Cache lookups that were misses", misses, {"cache": name})
+    yield ("frame_cache_bytes", "gauge", "Bytes of prepared images held in memory", frame_cache.current_bytes, {})
+
+
+registry.register_collector(cache_metrics)
+
+
+def warm_up(lang_codes=()):
+    """Pays a first render's one-off costs up front: finding ffmpeg and the fonts, importing gTTS."""
+    ffmpeg_exe()
+    for script in {LANG_SCRIPTS.get(lang_code, "latin") for lang_code in lang_codes}:
+        find_font_file(script)
+    try:
+        import gtts
+    except ImportError:
+        pass
+
+
+def render_settings(lang_code, profile=DEFAULT_PROFILE, tts_backend=None, camera=DEFAULT_CAMERA):
+    """Everything besides the script and images that changes the rendered video."""
+    return {
+        "profile": list(profile),
+        "crossfade": CROSSFADE,
+        "zoom": ZOOM,
+        "camera": camera,
+        "motions": {} if camera == "static" else {
+            "presets": [list(motion) for motion in MOTIONS.values()],
+            "oversample": OVERSAMPLE,
+            "resampler": RESAMPLER,
+        },
+        "font": find_font_file(LANG_SCRIPTS.get(lang_code, "latin")),
+        "font_size": FONT_SIZE,
+        "tts": (tts_backend or GTTSBackend()).name,
+    }
+
+
+def generate_video(job, sentences, images, lang_code, profile=DEFAULT_PROFILE, tts_backend=None,
+                   cache=None, segment_cache=None, camera=DEFAULT_CAMERA, stream=False, executor=None,
+                   tts_cache=None, workers=RENDER_WORKERS):
+    """Runs the full generation pipeline inside a job's workspace.
+
+    `sentences` are the scenes, in order: each a sentence, or a
+    text_processing.SceneScript of sentences spoken one after another under
+    one caption (see parse_text_to_scenes). Returns the paths of the
+    finished video and its audio track. If the same video was rendered
+    before, it comes straight from the render cache and none of the stages
+    run. Otherwise every per-sentence artifact (audio clip, caption raster,
+    encoded scene) is reused when its content is unchanged, so editing one
+    sentence only re-renders the scenes it touches. `profile` is a
+    RenderProfile from render.PROFILES; a draft shares the audio clips and
+    prepared images with a later full render. `tts_backend` defaults to gTTS
+    (see tts.py). `camera` is one of render.CAMERAS. Stage timings and
+    counters are published through metrics.py and returned under "metrics".
+
+    With `stream`, scenes are also published as an HLS playlist in
+    `job.workdir/stream` as they finish; its path is reported as the job's
+    "stream" artifact once the first scene is playable. `executor` is a
+    long-lived render pool (render.start_render_pool) to encode scenes on,
+    `workers` at a time. `cache`, `segment_cache` and `tts_cache` default
+    to the caches shared by the whole process.
+    """
+    cache = cache or default_render_cache()
+    segment_cache = segment_cache or default_segment_cache()
+    video_path = os.path.join(job.workdir, f"pib_video_{profile.name}.mp4")
+    scripts = [SceneScript((scene,), i) if isinstance(scene, str) else scene for i, scene in enumerate(sentences)]
+    scenes = [script.sentences for script in scripts]
+    with RunMetrics(job.id, profile=profile.name, language=lang_code) as run:
+        run.count("sentences", sum(len(scene) for scene in scenes))
+        run.count("scenes", len(scenes))
+        run.count("images", len(images))
+        with run.stage("cache_lookup"):
+            cache_key = render_key(
+                sentences,
+                lang_code,
+                [content_hash(data) for data in images],
+                render_settings(lang_code, profile, tts_backend, camera)
+            )
+            cached = cache.fetch(cache_key, video_path)
+        if cached:
+            run.count("render_cache_hits")
+            return {"video": video_path, "audio": None, "cached": True, "profile": profile.name,
+                    "metrics": run.finish()}
+        run.count("render_cache_misses")
+
+        with run.stage("images"):
+            job.report(STAGE_IMAGES)
+            image_frames, skipped = load_images(images, background_size(profile.size, camera))
+            if skipped:
+                job.report(warnings=skipped)
+
+        with run.stage("tts"):
+            job.report(STAGE_AUDIO)
+            # One clip per sentence, synthesized in parallel and cached on disk, so
+            # regrouping sentences into scenes never synthesizes them again
+            clips = iter(synthesize_sentences([sentence for scene in scenes for sentence in scene], lang_code,
+                                              backend=tts_backend, cache=tts_cache))
+            scene_audio = [[next(clips) for _ in scene] for scene in scenes]
+            # Join the clips into the final track, each scene's padded to its length
+            audio_path = render_audio_track(scene_audio, os.path.join(job.workdir, "audio.m4a"), profile.fps)
+            job.report(audio=audio_path)
+
+        with run.stage("scenes"):
+            job.report(STAGE_SCENES)
+            timeline = build_timeline(
+                [" ".join(scene) for scene in scenes],
+                [scene_duration(audio) for audio in scene_audio],
+                image_frames,
+                lang_code,
+                profile,
+                camera=camera,
+                positions=[script.position for script in scripts]
+            )
+
+        with run.stage("encode"):
+            job.report(STAGE_RENDER)
+            hls = None
+            first_segment_s = None
+            if stream:
+                started = time.perf_counter()
+
+                def segment_live(playlist_path):
+                    nonlocal first_segment_s
+                    if first_segment_s is None:
+                        first_segment_s = time.perf_counter() - started
+                        job.report(stream=playlist_path)
+
+                hls = HLSWriter(os.path.join(job.workdir, "stream"), profile.fps, audio_path, segment_live)
+            rendered = render_video(
+                timeline,
+                video_path,
+                audio_path=audio_path,
+                workdir=job.workdir,
+                workers=workers,
+                progress=lambda done, total: job.report(progress=done / total, frames=(done, total)),
+                segment_cache=segment_cache,
+                stream=hls,
+                executor=executor
+            )
+            cache.store(cache_key, video_path)
+        run.frames.merge(rendered.frames)
+        run.count("frames", timeline.total_frames)
+        run.count("scenes_rendered", rendered.rendered)
+        run.count("scenes_reused", rendered.reused)
+        run.count("bytes_written", os.path.getsize(video_path) + os.path.getsize(audio_path))
+        return {
+            "video": video_path,
+            "audio": audio_path,
+            "cached": False,
+            "profile": profile.name,
+            "scenes_rendered": rendered.rendered,
+            "scenes_reused": rendered.reused,
+            "stream": hls.playlist_path if hls else None,
+            "first_segment_s": first_segment_s,
+            "metrics": run.finish(),
+        }
@@ -0,0 +1,571 @@
+import bisect
+import hashlib
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+
+import numpy as np
+
+from captions import CAPTION_WIDTH, FONT_SIZE, caption_position, render_caption
+from images import OUTPUT_SIZE, OVERSAMPLE, RESAMPLER, WindowSampler, scale_frame, zoom_frame
+from media import build_audio_track, ffmpeg_exe, run_ffmpeg
+from metrics import FrameStats
+
+FPS = 24
+CROSSFADE = 0.5 # Seconds each scene fades in over the previous one
+ZOOM = 1.1 # Close-up of the "static" camera
+RENDER_WORKERS = int(os.environ.get("PRESSPLAY_RENDER_WORKERS", os.cpu_count() or 1))
+
+# Output resolution, frame rate and x264 settings for one kind of render.
+# threads=0 lets x264 pick.
+RenderProfile = namedtuple("RenderProfile", ["name", "size", "fps", "codec", "preset", "crf", "threads"])
+
+PROFILES = {
+    # Quarter-size, half-rate and the fastest preset: for checking pacing and captions.
+    "draft": RenderProfile("draft", (640, 360), 12, "libx264", "ultrafast", 30, 0),
+    # What the app has always produced (MoviePy's write_videofile defaults).
+    "full": RenderProfile("full", OUTPUT_SIZE, FPS, "libx264", "medium", 23, 0),
+}
+DEFAULT_PROFILE = PROFILES["full"]
+
+# A camera move over one scene: the zoom at its start and end (1.0 shows the
+# whole base frame, OVERSAMPLE an output-sized window of it), the direction
+# the view drifts in (x, y in -1..1; (1, 0) pans left to right) and the
+# name of its easing curve in EASINGS.
+Motion = namedtuple("Motion", ["name", "zoom_start", "zoom_end", "pan", "easing"])
+
+MOTIONS = {
+    "zoom_in": Motion("zoom_in", 1.0, OVERSAMPLE, (0, 0), "ease_in_out"),
+    "zoom_out": Motion("zoom_out", OVERSAMPLE, 1.0, (0, 0), "ease_in_out"),
+    # Pans stay at OVERSAMPLE, so every frame is an output-sized slice of the base.
+    "pan_left": Motion("pan_left", OVERSAMPLE, OVERSAMPLE, (-1, 0), "ease_in_out"),
+    "pan_right": Motion("pan_right", OVERSAMPLE, OVERSAMPLE, (1, 0), "ease_in_out"),
+    "pan_up": Motion("pan_up", OVERSAMPLE, OVERSAMPLE, (0, -1), "ease_in_out"),
+    "pan_down": Motion("pan_down", OVERSAMPLE, OVERSAMPLE, (0, 1), "ease_in_out"),
+}
+
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in_out": lambda t: t * t * (3 - 2 * t),
+    "ease_out": lambda t: 1 - (1 - t) * (1 - t),
+}
+
+# Camera modes: "ken_burns" cycles through KEN_BURNS scene by scene,
+# "static" holds a fixed ZOOM close-up, and a MOTIONS name moves every scene alike.
+KEN_BURNS = ["zoom_in", "pan_right", "zoom_out", "pan_left"]
+CAMERAS = ["ken_burns", "static"] + list(MOTIONS)
+DEFAULT_CAMERA = "ken_burns"
+
+# A caption ready to blend: colour premultiplied by alpha and the inverse
+# alpha, both on a 0-256 scale so blending is a multiply, add and shift.
+CaptionLayer = namedtuple("CaptionLayer", ["premult", "inverse", "x", "y"])
+
+# One sentence on the timeline. `start` and `slot` are in frames: the scene
+# owns frames [start, start + slot) of the audio, fades in over its first
+# `fade` frames, and is on screen for `span` frames in all, including the
+# next scene's fade. `background` is the finished frame when `motion` is
+# None, and the oversampled base the Motion is cut from otherwise. `key`
+# hashes everything that determines how the scene looks, but not where it starts.
+# `background_id` (a hash of the background's pixels) and `caption_args`
+# (render_caption's arguments) let a worker process rebuild both layers
+# instead of receiving them.
+Scene = namedtuple("Scene", ["background", "caption", "start", "slot", "fade", "key", "motion", "span",
+                             "background_id", "caption_args"])
+
+Timeline = namedtuple("Timeline", ["scenes", "total_frames", "fps", "size", "profile"])
+
+# What a segment render produced: the output path, how many segments were
+# encoded versus reused from the segment cache, and the FrameStats of the
+# frames that were encoded.
+RenderResult = namedtuple("RenderResult", ["path", "rendered", "reused", "frames"])
+
+
+# --- Timeline ---
+
+def scene_slots(durations, fps=FPS):
+    """Rounds each sentence's audio length up to whole frames."""
+    return [max(1, math.ceil(d * fps - 1e-6)) for d in durations]
+
+
+def scene_motion(camera, index):
+    """The Motion of scene `index` under a camera mode, or None for a static camera."""
+    if camera == "static":
+        return None
+    if camera == "ken_burns":
+        return MOTIONS[KEN_BURNS[index % len(KEN_BURNS)]]
+    return MOTIONS[camera]
+
+
+def _pick(choice, previous, following, count):
+    """`choice` (mod `count`), or if the previous scene has it, the next index that neither neighbour wants."""
+    choice %= count
+    if choice != previous:
+        return choice
+    others = [(choice + step) % count for step in range(1, count)]
+    return next((other for other in others if other != following), others[0] if others else choice)
+
+
+def scene_looks(positions, image_count):
+    """The (background, camera move) indices of scenes at `positions`.
+
+    Scenes look like their position: image `position % image_count`, move
+    `position % len(KEN_BURNS)`. A scene that would repeat the previous
+    scene's image or move (pieces of one long sentence share a position)
+    takes another one, skipping the one the next scene wants, so the change
+    never ripples further down the timeline.
+    """
+    looks, previous = [], (None, None)
+    for i, position in enumerate(positions):
+        following = positions[i + 1] if i + 1 < len(positions) else None
+        look = tuple(_pick(position, before, None if following is None else following % count, count)
+                     for before, count in zip(previous, (image_count, len(KEN_BURNS))))
+        looks.append(look)
+        previous = look
+    return looks
+
+
+def background_size(size, camera=DEFAULT_CAMERA):
+    """The size images should be prepared at for a camera mode and output size."""
+    if camera == "static":
+        return tuple(size)
+    return (round(size[0] * OVERSAMPLE), round(size[1] * OVERSAMPLE))
+
+
+def motion_window(motion, progress, base_size):
+    """The crop window (left, top, right, bottom), in base pixels, `progress` (0-1) into a scene."""
+    eased = EASINGS[motion.easing](progress)
+    zoom = motion.zoom_start + (motion.zoom_end - motion.zoom_start) * eased
+    bw, bh = base_size
+    w, h = bw / zoom, bh / zoom
+    cx = (bw + motion.pan[0] * (2 * eased - 1) * (bw - w)) / 2
+    cy = (bh + motion.pan[1] * (2 * eased - 1) * (bh - h)) / 2
+    return (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+
+
+def make_caption_layer(caption, frame_size):
+    """Precomputes the blend terms for an RGBA caption raster."""
+    alpha = caption[..., 3:4].astype(np.uint16)
+    alpha += alpha >> 7 # 0-255 -> 0-256
+    premult = caption[..., :3].astype(np.uint16) * alpha
+    x, y = caption_position(caption, frame_size)
+    # Stored per channel: broadcasting a single alpha plane is ~10x slower to blend.
+    inverse = np.repeat(256 - alpha, 3, axis=2)
+    return CaptionLayer(premult, inverse, x, y)
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, (bytes, np.ndarray)) else str(part).encode("utf-8"))
+        h.update(b"|")
+    return h.hexdigest()
+
+
+def build_timeline(sentences, durations, image_frames, lang_code, profile=DEFAULT_PROFILE,
+                   crossfade=CROSSFADE, zoom=ZOOM, camera=DEFAULT_CAMERA, positions=None):
+    """Lays the sentences out as a flat list of scenes on the profile's frame grid.
+
+    `image_frames` should be prepared at background_size(profile.size, camera);
+    frames of any other size are scaled to it. Scene i gets the image and
+    camera move of `positions[i]` (by default, of i), as picked by
+    scene_looks, so neighbouring scenes never share either.
+    """
+    fps, size = profile.fps, profile.size
+    # Captions keep the same proportions at every resolution.
+    scale = size[0] / OUTPUT_SIZE[0]
+    fade = int(round(crossfade * fps))
+    base_size = background_size(size, camera)
+    frames = [frame if frame.shape[1::-1] == base_size else scale_frame(frame, base_size)
+              for frame in image_frames]
+    backgrounds = frames if camera != "static" else [zoom_frame(frame, zoom) for frame in frames]
+    background_ids = [_digest(np.ascontiguousarray(bg)) for bg in backgrounds]
+    slots = scene_slots(durations, fps)
+    positions = list(positions) if positions is not None else range(len(slots))
+    looks = scene_looks(positions[:len(slots)], len(backgrounds))
+    scenes, start = [], 0
+    for i, (sentence, slot, (background, move)) in enumerate(zip(sentences, slots, looks)):
+        caption_args = (sentence, lang_code, round(FONT_SIZE * scale), round(CAPTION_WIDTH * scale))
+        raster = render_caption(*caption_args)
+        caption = make_caption_layer(raster, size)
+        scene_fade = fade if i else 0
+        span = slot + (fade if i + 1 < len(slots) else 0)
+        motion = scene_motion(camera, move)
+        # Keyed on the actual pixels, so any change to the image, text, font or
+        # layout gives a new key and nothing stale is ever reused.
+        key = _digest(background_ids[background], raster.shape, raster,
+                      caption.x, caption.y, slot, scene_fade,
+                      *((motion, span, RESAMPLER) if motion else ()))
+        scenes.append(Scene(backgrounds[background], caption, start, slot, scene_fade, key,
+                            motion, span, background_ids[background], caption_args))
+        start += slot
+    return Timeline(scenes, start, fps, size, profile)
+
+
+# --- Frame engine ---
+
+class FrameRenderer:
+    """Computes frames of a timeline by blending only the active layers.
+
+    All work happens in buffers allocated once up front, and a frame that
+    is identical to the previous one (a static scene) is not recomputed.
+    Moving scenes cut their window out of the base frame for every frame.
+    """
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self._starts = [scene.start for scene in timeline.scenes]
+        w, h = timeline.size
+        self.out = np.empty((h, w, 3), np.uint8)
+        self._previous = np.empty((h, w, 3), np.uint8)
+        self._acc = np.empty((h, w, 3), np.uint16)
+        self._acc2 = np.empty((h, w, 3), np.uint16)
+        self._last_state = None
+        self._sampler = WindowSampler(timeline.size)
+        self.repeated = 0
+
+    def _window(self, scene, index):
+        if scene.motion is None:
+            return None
+        progress = min(1.0, (index - scene.start) / max(1, scene.span - 1))
+        return motion_window(scene.motion, progress, scene.background.shape[1::-1])
+
+    def _draw_scene(self, scene, dst, window):
+        if window is None:
+            np.copyto(dst, scene.background)
+        else:
+            self._sampler.sample(scene.background, window, dst)
+        cap = scene.caption
+        ch, cw = cap.inverse.shape[:2]
+        region = dst[cap.y:cap.y + ch, cap.x:cap.x + cw]
+        acc = self._acc[:ch, :cw]
+        np.multiply(region, cap.inverse, out=acc)
+        acc += cap.premult
+        acc >>= 8
+        np.copyto(region, acc, casting="unsafe")
+
+    def render(self, index):
+        """Returns frame `index` (the shared output buffer; copy it to keep it)."""
+        scenes = self.timeline.scenes
+        k = bisect.bisect_right(self._starts, index) - 1
+        scene = scenes[k]
+        into_scene = index - scene.start
+        weight = 256 if into_scene >= scene.fade else (into_scene * 256) // scene.fade
+
+        window = self._window(scene, index)
+        previous = scenes[k - 1] if weight < 256 else None
+        previous_window = self._window(previous, index) if previous else None
+        state = (k, weight, window, previous_window)
+        if state == self._last_state:
+            self.repeated += 1
+            return self.out
+        self._last_state = state
+
+        self._draw_scene(scene, self.out, window)
+        if previous:
+            # Crossfade: the previous scene is still on screen underneath.
+            self._draw_scene(previous, self._previous, previous_window)
+            np.multiply(self._previous, np.uint16(256 - weight), out=self._acc)
+            np.multiply(self.out, np.uint16(weight), out=self._acc2)
+            self._acc += self._acc2
+            self._acc >>= 8
+            np.copyto(self.out, self._acc, casting="unsafe")
+        return self.out
+
+
+# --- Encoding ---
+
+def encoder_args(profile=DEFAULT_PROFILE, threads=None):
+    """ffmpeg video encoder arguments for a profile; `threads` overrides the profile's."""
+    threads = profile.threads if threads is None else threads
+    return ["-c:v", profile.codec, "-preset", profile.preset, "-crf", str(profile.crf),
+            "-pix_fmt", "yuv420p", "-threads", str(threads)]
+
+
+def encode_frames(timeline, out_path, frames=None, audio_path=None, progress=None, threads=None,
+                  stats=None):
+    """Streams raw RGB frames of the timeline into an ffmpeg stdin pipe.
+
+    `frames` is a range of frame indices (the whole timeline by default) and
+    `progress(done, total)` is called as frames are written. Per-frame
+    timings are added to `stats`, a metrics.FrameStats, if given.
+    """
+    frames = frames if frames is not None else range(timeline.total_frames)
+    w, h = timeline.size
+    cmd = [
+        ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(timeline.fps), "-i", "-",
+    ]
+    if audio_path:
+        cmd += ["-i", audio_path, "-c:a", "copy"]
+    cmd += encoder_args(timeline.profile, threads) + ["-movflags", "+faststart", out_path]
+
+    renderer = FrameRenderer(timeline)
+    stats = stats if stats is not None else FrameStats()
+    clock = time.perf_counter
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for done, index in enumerate(frames, 1):
+                start = clock()
+                frame = renderer.render(index)
+                rendered = clock()
+                proc.stdin.write(frame.data)
+                stats.add(rendered - start, clock() - rendered)
+                if progress and (done % timeline.fps == 0 or done == len(frames)):
+                    progress(done, len(frames))
+        except BrokenPipeError:
+            pass # ffmpeg exited early; its stderr explains why
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = proc.wait()
+            stats.repeated += renderer.repeated
+        if returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().decode(errors='replace').strip()}")
+    return out_path
+
+
+def scene_duration(scene_audio):
+    """Seconds of speech in a scene: a SentenceAudio, or a list of them played in turn."""
+    if isinstance(scene_audio, list):
+        return sum(clip.duration for clip in scene_audio)
+    return scene_audio.duration
+
+
+def render_audio_track(scene_audio, out_path, fps=FPS):
+    """Builds the AAC track, padded to the scene slots, from one SentenceAudio or list of them per scene."""
+    slots = [slot / fps for slot in scene_slots([scene_duration(scene) for scene in scene_audio], fps)]
+    paths = [[clip.path for clip in scene] if isinstance(scene, list) else scene.path for scene in scene_audio]
+    return build_audio_track(paths, slots, out_path)
+
+
+# --- Parallel rendering ---
+
+def split_segments(timeline, scenes_per_segment=1):
+    """Cuts the timeline at scene starts into (first_scene, frame range) segments."""
+    scenes = timeline.scenes
+    segments = []
+    for first in range(0, len(scenes), scenes_per_segment):
+        last = min(first + scenes_per_segment, len(scenes))
+        end = scenes[last].start if last < len(scenes) else timeline.total_frames
+        segments.append((first, range(scenes[first].start, end)))
+    return segments
+
+
+def segment_timeline(timeline, first, last):
+    """The scenes a segment needs: its own plus the one it fades in over.
+
+    Because every frame is a pure function of its index, a segment rendered
+    from this sub-timeline is identical to the same frames of a serial
+    render, crossfade at its leading edge included.
+    """
+    lo = max(0, first - 1)
+    return timeline._replace(scenes=timeline.scenes[lo:last])
+
+
+def segment_key(timeline, first, last):
+    """Content hash of a segment: its scenes, the scene it fades in over, and the output format."""
+    lo = max(0, first - 1)
+    keys = [scene.key for scene in timeline.scenes[lo:last]]
+    return _digest(first - lo, *keys, timeline.fps, timeline.size, encoder_args(timeline.profile))
+
+
+def save_backgrounds(timeline, folder):
+    """Writes each distinct background of the timeline to `folder` once, named by its id."""
+    os.makedirs(folder, exist_ok=True)
+    for scene in timeline.scenes:
+        path = os.path.join(folder, scene.background_id + ".npy")
+        if not os.path.exists(path):
+            np.save(path, scene.background)
+
+
+def detach_timeline(timeline):
+    """The timeline without its pixels, to send to a worker process.
+
+    A 1536x864 background and the two uint16 caption planes come to ~12 MB
+    a scene; without them a segment task is a few hundred bytes. The worker
+    loads the backgrounds saved by save_backgrounds and redraws the captions.
+    """
+    return timeline._replace(scenes=[scene._replace(background=None, caption=None) for scene in timeline.scenes])
+
+
+# Backgrounds a worker process has loaded, by id; they're reused by its later segments and renders.
+_worker_backgrounds = OrderedDict()
+WORKER_BACKGROUNDS = 8
+
+
+def _load_background(folder, background_id):
+    background = _worker_backgrounds.pop(background_id, None)
+    if background is None:
+        background = np.load(os.path.join(folder, background_id + ".npy"))
+        background.flags.writeable = False
+    _worker_backgrounds[background_id] = background
+    while len(_worker_backgrounds) > WORKER_BACKGROUNDS:
+        _worker_backgrounds.popitem(last=False)
+    return background
+
+
+def attach_timeline(timeline, background_folder):
+    """Rebuilds a detached timeline's backgrounds and caption layers, in a worker process."""
+    return timeline._replace(scenes=[
+        scene._replace(background=_load_background(background_folder, scene.background_id),
+                       caption=make_caption_layer(render_caption(*scene.caption_args), timeline.size))
+        for scene in timeline.scenes
+    ])
+
+
+def _render_segment(timeline, frames, out_path, threads, background_folder=None):
+    # Runs in a worker process (or inline when there is a single worker). A
+    # timeline sent to a worker arrives detached, with its backgrounds in `background_folder`.
+    if background_folder is not None:
+        timeline = attach_timeline(timeline, background_folder)
+    stats = FrameStats()
+    encode_frames(timeline, out_path, frames=frames, threads=threads, stats=stats)
+    return stats
+
+
+def _warm_worker():
+    # Runs as each pool process starts; importing this module loaded the frame engine.
+    ffmpeg_exe()
+
+
+def start_render_pool(workers=RENDER_WORKERS):
+    """A long-lived pool of render processes, started and warmed up now instead of at a render.
+
+    Pass it to render_video as `executor`; one pool can serve every job in the process.
+    """
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_warm_worker)
+    # Workers are only spawned for pending tasks, so give each one something to start on,
+    # and wait: a worker still importing NumPy would slow the first render down, not speed it up.
+    wait([pool.submit(_warm_worker) for _ in range(workers)])
+    return pool
+
+
+def concat_segments(segment_paths, out_path, audio_path=None):
+    """Joins encoded segments with the concat demuxer (no re-encode) and muxes the audio once."""
+    list_path = out_path + ".segments.txt"
+    with open(list_path, "w") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    args = ["-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        args += ["-i", audio_path, "-map", "0:v", "-map", "1:a"]
+    try:
+        run_ffmpeg(args + ["-c", "copy", "-movflags", "+faststart", out_path])
+    finally:
+        os.remove(list_path)
+    return out_path
+
+
+def render_segments(timeline, out_path, audio_path=None, workdir=".", workers=RENDER_WORKERS,
+                    scenes_per_segment=None, progress=None, executor=None, segment_cache=None, stream=None):
+    """Renders the timeline as independent segments, then concatenates them.
+
+    Segments are encoded in a process pool when `workers` > 1 (pass
+    `executor` to reuse a long-lived pool). By default scenes are grouped
+    so each worker gets about four segments.
+
+    With a `segment_cache` (a RenderCache), every scene becomes its own
+    segment, keyed by its content and the scene it fades in over. Segments
+    already in the cache are reused, so after an edit only the changed
+    scenes and the scenes that crossfade out of them are encoded again.
+
+    With a `stream` (a streaming.HLSWriter), every scene is also its own
+    segment, published to the stream as soon as it is encoded or fetched,
+    so playback can begin long before the segments are concatenated.
+    """
+    if segment_cache is not None or stream is not None:
+        scenes_per_segment = 1
+    elif scenes_per_segment is None:
+        scenes_per_segment = max(1, math.ceil(len(timeline.scenes) / (workers * 4)))
+    segments = split_segments(timeline, scenes_per_segment)
+    # Split the cores between the x264 encoders instead of oversubscribing them.
+    threads = timeline.profile.threads or max(1, (os.cpu_count() or 1) // max(1, workers))
+
+    segment_dir = tempfile.mkdtemp(prefix="segments-", dir=workdir)
+    paths = [os.path.join(segment_dir, f"segment_{i:05d}.mp4") for i in range(len(segments))]
+    stats = FrameStats()
+    done = 0
+    if stream is not None:
+        stream.begin([len(frames) for _, frames in segments])
+
+    def segment_finished(i, frames):
+        nonlocal done
+        done += len(frames)
+        if stream is not None:
+            stream.add(i, paths[i], frames)
+        if progress:
+            progress(done, timeline.total_frames)
+
+    own_executor = False
+    try:
+        todo = []
+        for i, (first, frames) in enumerate(segments):
+            key = segment_key(timeline, first, first + scenes_per_segment) if segment_cache else None
+            if key and segment_cache.fetch(key, paths[i]):
+                segment_finished(i, frames)
+            else:
+                todo.append((i, first, frames, key))
+
+        def finished(i, frames, key):
+            if key:
+                segment_cache.store(key, paths[i])
+            segment_finished(i, frames)
+
+        if workers <= 1 or len(todo) <= 1:
+            for i, first, frames, key in todo:
+                stats.merge(_render_segment(segment_timeline(timeline, first, first + scenes_per_segment),
+                                            frames, paths[i], None))
+                finished(i, frames, key)
+        elif todo:
+            if executor is None:
+                own_executor = True
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            # Workers get the backgrounds through files, each written and loaded once per render,
+            # instead of a copy in every task.
+            background_folder = os.path.join(segment_dir, "backgrounds")
+            save_backgrounds(timeline, background_folder)
+            futures = {}
+            for i, first, frames, key in todo:
+                sub = detach_timeline(segment_timeline(timeline, first, first + scenes_per_segment))
+                future = executor.submit(_render_segment, sub, frames, paths[i], threads, background_folder)
+                futures[future] = (i, frames, key)
+            for future in as_completed(futures):
+                stats.merge(future.result())
+                finished(*futures[future])
+
+        if stream is not None:
+            stream.finish()
+        concat_segments(paths, out_path, audio_path)
+        return RenderResult(out_path, len(todo), len(segments) - len(todo), stats)
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+
+def render_video(timeline, out_path, audio_path=None, workdir=".", workers=RENDER_WORKERS,
+                 progress=None, segment_cache=None, stream=None, executor=None):
+    """Renders the timeline to an MP4 and returns a RenderResult.
+
+    Uses a single ffmpeg pipe for one worker without a cache or a stream,
+    and segment rendering (parallel, cached, streamed, or any mix) otherwise.
+    Parallel segments run on `executor` if given (see start_render_pool).
+    """
+    if segment_cache is None and stream is None and (workers <= 1 or len(timeline.scenes) < 2):
+        stats = FrameStats()
+        encode_frames(timeline, out_path, audio_path=audio_path, progress=progress, stats=stats)
+        return RenderResult(out_path, 1, 0, stats)
+    return render_segments(timeline, out_path, audio_path, workdir, workers,
+                           progress=progress, executor=executor, segment_cache=segment_cache, stream=stream)
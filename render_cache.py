@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+from storage import atomic_path
+
+DEFAULT_CACHE_DIR = os.environ.get("PRESSPLAY_RENDER_CACHE", os.path.join(".cache", "renders"))
+DEFAULT_MAX_BYTES = int(os.environ.get("PRESSPLAY_RENDER_CACHE_MB", "2048")) * 1024 * 1024
+SEGMENT_CACHE_DIR = os.environ.get("PRESSPLAY_SEGMENT_CACHE", os.path.join(".cache", "segments"))
+SEGMENT_CACHE_MAX_BYTES = int(os.environ.get("PRESSPLAY_SEGMENT_CACHE_MB", "2048")) * 1024 * 1024
+
+
+def normalize_sentence(sentence):
+    """Collapses whitespace so cosmetic edits don't change the cache key."""
+    return " ".join(sentence.split())
+
+
+def render_key(sentences, lang_code, image_hashes, settings):
+    """Content hash of everything that determines the finished video.
+
+    A scene may also be given as a text_processing.SceneScript; how the
+    sentences are grouped into scenes, and the scenes' positions, are then
+    part of the key.
+    """
+    payload = json.dumps({
+        "sentences": [normalize_sentence(s) if isinstance(s, str)
+                      else [[normalize_sentence(p) for p in s.sentences], s.position] for s in sentences],
+        "lang": lang_code,
+        "images": list(image_hashes),
+        "settings": settings,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """Disk cache of encoded MP4s (finished videos or per-scene segments) with a size
+    cap and least-recently-used eviction.
+
+    The index lives in SQLite, so any number of threads and processes can
+    read and write the cache at the same time; files are written under a
+    temp name and renamed into place, so readers never see a partial video.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, size INTEGER, last_access REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+
+    def _connect(self):
+        db = sqlite3.connect(os.path.join(self.cache_dir, "index.sqlite"), timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return _Transaction(db)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".mp4")
+
+    @staticmethod
+    def _count(db, name):
+        db.execute("INSERT INTO stats VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def fetch(self, key, dest_path):
+        """On a hit, places the cached video at `dest_path` and returns True.
+
+        The file is hard-linked (or copied) out of the cache, so a later
+        eviction can't delete it from under the caller.
+        """
+        path = self._path(key)
+        with self._connect() as db:
+            found = db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+            if found and os.path.exists(path):
+                db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                _link_or_copy(path, dest_path)
+                self._count(db, "hits")
+                return True
+            if found:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(db, "misses")
+            return False
+
+    def store(self, key, src_path):
+        """Adds a finished video to the cache, evicting old entries to stay under the cap."""
+        path = self._path(key)
+        with atomic_path(path) as tmp_path:
+            _link_or_copy(src_path, tmp_path)
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, os.path.getsize(path), time.time()))
+            self._evict(db, keep=key)
+
+    def _evict(self, db, keep):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM entries WHERE key != ? ORDER BY last_access", (keep,)).fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+            total -= size
+            self._count(db, "evictions")
+
+    def stats(self):
+        """Returns hit/miss/eviction counts and the cache's current size."""
+        with self._connect() as db:
+            counts = dict(db.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = counts.get("hits", 0) + counts.get("misses", 0)
+        return {
+            "hits": counts.get("hits", 0),
+            "misses": counts.get("misses", 0),
+            "evictions": counts.get("evictions", 0),
+            "hit_rate": counts.get("hits", 0) / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+class _Transaction:
+    """Runs a block as one immediate (write-locked) SQLite transaction, then closes."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.db.close()
+
+
+def _link_or_copy(src, dest):
+    if os.path.exists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import soupsieve
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from storage import atomic_write
+
+log = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DEFAULT_CACHE_DIR = os.environ.get("PRESSPLAY_SCRAPE_CACHE", os.path.join(".cache", "pib"))
+DEFAULT_MAX_WORKERS = 8
+TIMEOUT = 10
+
+# Content containers of the PIB page layouts, in order of priority
+SELECTORS = [
+    'span.blogdescription',  # blogs.pib.gov.in
+    'div.content-area',      # Current layout (e.g. release 2188503)
+    'div.Release-content',   # Old layout
+    'div#pressrelease',      # Older layout
+    'div.inn-left-cont',     # Another common layout
+]
+# Compiled once: one pass over the document finds every candidate, then the
+# per-selector matchers pick the highest-priority one.
+_ANY_SELECTOR = soupsieve.compile(", ".join(SELECTORS))
+_SELECTORS = [(selector, soupsieve.compile(selector)) for selector in SELECTORS]
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml" # C parser, several times faster than html.parser
+except ImportError:
+    PARSER = "html.parser"
+
+
+# --- Extraction ---
+
+def extract_text(html):
+    """Returns the cleaned press release text from a PIB page, or None if no layout matched."""
+    soup = BeautifulSoup(html, PARSER)
+    candidates = _ANY_SELECTOR.select(soup)
+    content_div = None
+    for selector, matcher in _SELECTORS:
+        content_div = next((tag for tag in candidates if matcher.match(tag)), None)
+        if content_div is not None:
+            log.debug("Found content with selector: '%s'", selector)
+            break
+    if content_div is None:
+        return None
+
+    # Get text from all <p> tags within the found div
+    paragraphs = (p.get_text(strip=True) for p in content_div.find_all('p'))
+    main_text = "\n\n".join(text for text in paragraphs if text)
+
+    # Fallback if no <p> tags were found, just get all text
+    if not main_text.strip():
+        main_text = content_div.get_text(strip=True)
+    return main_text.strip()
+
+
+# --- Scraper ---
+
+class PIBScraper:
+    """Fetches PIB releases concurrently over one pooled session, with an on-disk cache.
+
+    Each URL's ETag/Last-Modified are stored so repeat fetches are
+    conditional GETs, and extracted text is cached by the page's content
+    hash, so unchanged pages are never parsed twice.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_workers=DEFAULT_MAX_WORKERS, timeout=TIMEOUT):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "not_modified": 0, "parsed": 0, "parse_cache_hits": 0, "errors": 0}
+        os.makedirs(os.path.join(cache_dir, "text"), exist_ok=True)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _page_path(self, url, ext):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ext)
+
+    def _text_path(self, content_hash):
+        return os.path.join(self.cache_dir, "text", content_hash + ".txt")
+
+    def _load_meta(self, url):
+        try:
+            with open(self._page_path(url, ".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _text_for(self, content_hash, load_html):
+        """Reads a page's text from the parse cache, or extracts it from `load_html()`."""
+        text_path = self._text_path(content_hash)
+        if os.path.exists(text_path):
+            self._count("parse_cache_hits")
+            with open(text_path, encoding="utf-8") as f:
+                text = f.read()
+            return text or None
+        self._count("parsed")
+        text = extract_text(load_html())
+        atomic_write(text_path, (text or "").encode("utf-8"))
+        return text
+
+    def fetch(self, url):
+        """Returns the release text for one URL, or None if it can't be fetched or parsed."""
+        meta = self._load_meta(url)
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and meta.get("content_hash"):
+                self._count("not_modified")
+                return self._text_for(meta["content_hash"], lambda: _read(self._page_path(url, ".html")))
+            response.raise_for_status() # Will raise an error for 4xx/5xx responses
+        except (requests.exceptions.RequestException, OSError) as e:
+            self._count("errors")
+            log.warning("Error fetching %s: %s", url, e)
+            return None
+
+        self._count("fetched")
+        html = response.content
+        content_hash = hashlib.sha256(html).hexdigest()
+        atomic_write(self._page_path(url, ".html"), html)
+        atomic_write(self._page_path(url, ".json"), json.dumps({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+        }).encode("utf-8"))
+        text = self._text_for(content_hash, lambda: html)
+        if text is None:
+            log.warning("No content selectors matched for %s", url)
+        return text
+
+    def fetch_many(self, urls):
+        """Fetches many URLs concurrently; returns {url: text or None} in input order."""
+        urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return dict(zip(urls, pool.map(self.fetch, urls)))
+
+    def close(self):
+        self.session.close()
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+_default_scraper = None
+_default_lock = threading.Lock()
+
+
+def scrape_pib_text(url):
+    """Scrapes the main press release text from a PIB URL (None on failure)."""
+    global _default_scraper
+    with _default_lock:
+        if _default_scraper is None:
+            _default_scraper = PIBScraper()
+    return _default_scraper.fetch(url)
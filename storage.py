@@ -0,0 +1,80 @@
+"""Storage helpers shared by the caches: atomic file writes and an in-memory LRU bounded in bytes."""
+import contextlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+@contextlib.contextmanager
+def atomic_path(path, suffix=".tmp"):
+    """Yields a temp path next to `path` to write; it replaces `path` on success and is removed on error.
+
+    Readers, such as a player polling a playlist or another process sharing
+    a cache, never see a partial file.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=suffix)
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write(path, data):
+    """Writes bytes (or text, as UTF-8) to `path` atomically; see atomic_path."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+
+class BytesLRU:
+    """Thread-safe LRU of NumPy arrays, bounded in their total bytes.
+
+    Values are built outside the lock, so a slow miss never holds up hits;
+    two threads racing on the same new key both build it and the second
+    insert is a no-op.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Returns the value cached under `key`, calling `build()` to make it only if it isn't cached."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = build()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self.current_bytes += value.nbytes
+                self._evict()
+            return self._entries[key]
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone is over the bound.
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, value = self._entries.popitem(last=False)
+            self.current_bytes -= value.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
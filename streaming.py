@@ -0,0 +1,98 @@
+"""HLS output that grows while a video renders, so playback can start at the first scene.
+
+Every encoded scene segment is muxed with its slice of the audio track into
+an MPEG-TS file and appended to an EVENT playlist. Players poll the
+playlist, so they start playing as soon as the first segment is listed and
+keep following it until the end tag is written.
+"""
+import math
+import os
+
+from media import SAMPLE_RATE, audio_slice_args, run_ffmpeg
+from storage import atomic_path, atomic_write
+
+PLAYLIST = "stream.m3u8"
+SEGMENT_NAME = "seg_{:05d}.ts"
+# Every segment's clocks start this far in, so the AAC priming frame before
+# the first sample never has a negative timestamp (which ffmpeg would "fix"
+# by shifting just the first segment).
+TIMESTAMP_OFFSET = 1.0
+
+
+class HLSWriter:
+    """Publishes rendered segments, in order, to an HLS playlist in `out_dir`.
+
+    Segments may be added in any order (parallel workers finish out of
+    order); each one is listed once every segment before it is listed too.
+    `on_update(playlist_path)` is called whenever new segments go live.
+    """
+
+    def __init__(self, out_dir, fps, audio_path=None, on_update=None):
+        self.out_dir = out_dir
+        self.audio_path = audio_path
+        self.fps = fps
+        self.on_update = on_update
+        self.playlist_path = os.path.join(out_dir, PLAYLIST)
+        self.target_duration = None
+        self._durations = [] # Seconds per segment, in playlist order
+        self._ready = set() # Indices of segments muxed but maybe not listed yet
+        self._listed = 0
+        self._ended = False
+        os.makedirs(out_dir, exist_ok=True)
+
+    def begin(self, frame_counts):
+        """Declares the segments' lengths in frames; the target duration can't change once playing."""
+        self._durations = [count / self.fps for count in frame_counts]
+        self.target_duration = max(1, math.ceil(max(self._durations, default=1)))
+        self._write_playlist()
+
+    def add(self, index, video_path, frames):
+        """Muxes an encoded segment covering the frame range `frames` and lists it when it's next.
+
+        The video is copied as is. Its slice of the audio is cut to the
+        sample and re-encoded: copying AAC packets would snap each slice to
+        the ~23 ms packet grid, and MPEG-TS has no edit list to hide the
+        overlap, so every join would repeat or drop a little audio.
+        """
+        start = frames.start / self.fps
+        args = ["-i", video_path]
+        if self.audio_path:
+            # Sample positions are rounded the same way for every segment, so slices tile the track exactly.
+            audio_input, trim = audio_slice_args(self.audio_path, round(frames.start * SAMPLE_RATE / self.fps),
+                                                 round(frames.stop * SAMPLE_RATE / self.fps))
+            args += audio_input + ["-map", "0:v:0", "-map", "1:a:0", "-af", trim,
+                                   "-c:a", "aac", "-b:a", "128k"]
+        # Shift the segment to its place on the timeline so the TS clocks run on across segments.
+        with atomic_path(os.path.join(self.out_dir, SEGMENT_NAME.format(index)), suffix=".ts.tmp") as tmp_path:
+            run_ffmpeg(args + ["-c:v", "copy", "-output_ts_offset", f"{TIMESTAMP_OFFSET + start:.6f}", "-muxdelay", "0",
+                               "-muxpreload", "0", "-f", "mpegts", tmp_path])
+        self._ready.add(index)
+        listed = self._listed
+        while self._listed in self._ready:
+            self._listed += 1
+        if self._listed > listed:
+            self._write_playlist()
+            if self.on_update:
+                self.on_update(self.playlist_path)
+
+    def finish(self):
+        """Ends the playlist, telling players no more segments will come."""
+        self._ended = True
+        self._write_playlist()
+        if self.on_update:
+            self.on_update(self.playlist_path)
+
+    def _write_playlist(self):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for i in range(self._listed):
+            lines += [f"#EXTINF:{self._durations[i]:.6f},", SEGMENT_NAME.format(i)]
+        if self._ended:
+            lines.append("#EXT-X-ENDLIST")
+        # Write-then-rename, so a player polling the playlist never reads half of it.
+        atomic_write(self.playlist_path, "\n".join(lines) + "\n")
@@ -1,62 +1,134 @@
-import requests
+import hashlib
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 from bs4 import BeautifulSoup
 
-def scrape_pib_text(url):
-    """Scrapes the main press release text from a PIB URL."""
-    print(f"Attempting to scrape URL: {url}\n")
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status() # Will raise an error for 4xx/5xx responses
-        print(f"Response: {response.status_code} OK")
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # We now look for multiple selectors in order of priority
-        selectors = [
-            'span.blogdescription',  # --- CORRECTED SELECTOR for blogs.pib.gov.in ---
-            'div.content-area',      # Selector 1 (for URLs like 2188503)
-            'div.Release-content',   # Selector 2 (Old layout)
-            'div#pressrelease',    # Selector 3 (Older layout)
-            'div.inn-left-cont'    # Selector 4 (Another common layout)
-        ]
-        
-        content_div = None
-        for selector in selectors:
-            content_div = soup.select_one(selector)
-            if content_div:
-                print(f"Found content with selector: '{selector}'")
-                break # Found one, stop looking
-        
+from scraper import PIBScraper, scrape_pib_text
+
+# --- Local fixtures: one saved page per PIB layout the scraper knows ---
+FIXTURES = {
+    "/blog": """<html><body><div class="header">PIB</div>
+        <span class="blogdescription"><p>Blog post first paragraph.</p><p>  </p>
+        <p>Blog post <b>second</b> paragraph.</p></span></body></html>""",
+    "/content-area": """<html><body><div class="inn-left-cont"><p>Wrong container.</p></div>
+        <div class="content-area"><p>The Union Cabinet has approved a landmark scheme.</p>
+        <p>Registration opens next month.</p></div></body></html>""",
+    "/release-content": """<html><body><div class="Release-content">
+        <p>Old layout release text.</p><p>Second paragraph.</p></div></body></html>""",
+    "/pressrelease": """<html><body><div id="pressrelease"><p>Older layout text.</p></div></body></html>""",
+    "/inn-left-cont": """<html><body><div class="inn-left-cont">No paragraphs, just <i>text</i>.</div></body></html>""",
+    "/no-match": """<html><body><div class="sidebar"><p>Nothing to see.</p></div></body></html>""",
+    "/last-modified": """<html><body><div class="content-area">
+        <p>A release served without an ETag.</p></div></body></html>""",
+}
+# Served with only a Last-Modified date, so re-fetches go through If-Modified-Since.
+LAST_MODIFIED_ONLY = {"/last-modified": "Wed, 01 Oct 2025 10:00:00 GMT"}
+
+
+def reference_extract_text(html):
+    """The original extraction: html.parser and select_one over the layouts in priority order."""
+    soup = BeautifulSoup(html, 'html.parser')
+    selectors = [
+        'span.blogdescription',
+        'div.content-area',
+        'div.Release-content',
+        'div#pressrelease',
+        'div.inn-left-cont',
+    ]
+    content_div = None
+    for selector in selectors:
+        content_div = soup.select_one(selector)
         if content_div:
-            # Get text from all <p> tags within the found div
-            paragraphs = content_div.find_all('p')
-            
-            main_text = "\n\n".join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
-
-            # Fallback if no <p> tags were found, just get all text
-            if not main_text.strip():
-                 print("No <p> tags found, falling back to all text.")
-                 main_text = content_div.get_text(strip=True)
-                 
-            return main_text.strip()
-        else:
-            print("ERROR: No content selectors matched.")
-            return None # Return None to trigger the error message
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching URL: {e}")
+            break
+    if not content_div:
         return None
+    paragraphs = content_div.find_all('p')
+    main_text = "\n\n".join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
+    if not main_text.strip():
+        main_text = content_div.get_text(strip=True)
+    return main_text.strip()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves FIXTURES with an ETag or a Last-Modified date and answers matching conditional GETs with 304."""
+    counts = {"200": 0, "304": 0}
+
+    def do_GET(self):
+        body = FIXTURES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.encode("utf-8")
+        if self.path in LAST_MODIFIED_ONLY:
+            validator = ("Last-Modified", LAST_MODIFIED_ONLY[self.path])
+            not_modified = self.headers.get("If-Modified-Since") == validator[1]
+        else:
+            validator = ("ETag", '"' + hashlib.md5(body).hexdigest() + '"')
+            not_modified = self.headers.get("If-None-Match") == validator[1]
+        if not_modified:
+            FixtureHandler.counts["304"] += 1
+            self.send_response(304)
+            self.send_header(*validator)
+            self.end_headers()
+            return
+        FixtureHandler.counts["200"] += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header(*validator)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_local_test():
+    """Scrapes the fixtures through a local HTTP server, twice, and checks them against the original extraction."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = {base + path: path for path in FIXTURES}
+    expected = {path: reference_extract_text(html) for path, html in FIXTURES.items()}
+    failures = 0
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            scraper = PIBScraper(cache_dir=cache_dir)
+            for attempt in ("cold", "conditional"):
+                results = scraper.fetch_many(urls)
+                for url, text in results.items():
+                    ok = text == expected[urls[url]]
+                    failures += not ok
+                    print(f"[{attempt}] {'OK  ' if ok else 'FAIL'} {urls[url]}: {text!r}")
+            print(f"Server responses: {FixtureHandler.counts}")
+            print(f"Scraper stats: {scraper.stats}")
+            # The second pass must be answered entirely by 304s and the parse cache
+            if scraper.stats["not_modified"] != len(FIXTURES) or scraper.stats["parsed"] != len(FIXTURES):
+                print("FAIL: the second pass did not use conditional GETs and the parse cache")
+                failures += 1
+            scraper.close()
+    finally:
+        server.shutdown()
+    return failures
+
 
 if __name__ == "__main__":
+    if "--local" in sys.argv:
+        print("--- STARTING LOCAL FIXTURE TEST ---")
+        failures = run_local_test()
+        print("--- ALL FIXTURES PASSED ---" if not failures else f"--- {failures} FAILURE(S) ---")
+        sys.exit(1 if failures else 0)
+
     # --- THIS IS THE URL YOU PROVIDED ---
     test_url = "https://blogs.pib.gov.in/blogsdescr.aspx?feaaid=394"
-    
+
     print("--- STARTING SCRAPER TEST ---")
+    print(f"Attempting to scrape URL: {test_url}\n")
     scraped_data = scrape_pib_text(test_url)
-    
+
     if scraped_data:
         print("\n--- SCRAPE SUCCESSFUL ---")
         print("First 200 characters:")
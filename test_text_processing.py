@@ -0,0 +1,121 @@
+import sys
+
+from text_processing import (CAPTION_MAX_CHARS, is_anchor, iter_paragraphs, iter_sentences, parse_text_to_scenes,
+                             parse_text_to_sentences)
+
+# --- Segmentation cases: (language, text, expected sentences) ---
+SENTENCE_CASES = [
+    ("en", "The Union Cabinet met today. It approved two schemes! Will they start soon? Yes.",
+     ["The Union Cabinet met today.", "It approved two schemes!", "Will they start soon?", "Yes."]),
+    # Honorifics never end a sentence.
+    ("en", "Shri. Narendra Modi met Smt. Droupadi Murmu. Dr. Singh was present.",
+     ["Shri. Narendra Modi met Smt. Droupadi Murmu.", "Dr. Singh was present."]),
+    # "Rs." and "No." only when a number follows.
+    ("en", "The outlay is Rs. 5,000 crore. See No. 5 of the list. The answer is no. It was not approved.",
+     ["The outlay is Rs. 5,000 crore.", "See No. 5 of the list.", "The answer is no.", "It was not approved."]),
+    # "etc." ends a sentence only before a capital.
+    ("en", "Roads, ports etc. were covered. Funds for roads, ports etc. are released.",
+     ["Roads, ports etc. were covered.", "Funds for roads, ports etc. are released."]),
+    ("en", "Roads, ports etc. New projects follow.", ["Roads, ports etc.", "New projects follow."]),
+    # Initials.
+    ("en", "A. P. J. Abdul Kalam was born in 1931. He was President.",
+     ["A. P. J. Abdul Kalam was born in 1931.", "He was President."]),
+    # Numbered and lettered points.
+    ("en", "1. The scheme opens in May. 2. It closes in June. IV. Forms are online.",
+     ["1. The scheme opens in May.", "2. It closes in June.", "IV. Forms are online."]),
+    # A lower-case word after a stop carries the sentence on.
+    ("en", "It costs approx. five crore and so on... the rest follows.",
+     ["It costs approx. five crore and so on... the rest follows."]),
+    # Quotes and brackets stay with their sentence.
+    ('en', 'He said, "The scheme is ready." (It starts in May.) Registration is open.',
+     ['He said, "The scheme is ready."', "(It starts in May.)", "Registration is open."]),
+    # Danda and double danda.
+    ("hi", "श्री. मोदी ने योजना शुरू की। यह पाँच साल चलेगी॥ आवेदन खुले हैं।",
+     ["श्री. मोदी ने योजना शुरू की।", "यह पाँच साल चलेगी॥", "आवेदन खुले हैं।"]),
+    # English punctuation in an Indic release.
+    ("hi", "योजना को मंज़ूरी मिली. आवेदन खुले हैं।", ["योजना को मंज़ूरी मिली.", "आवेदन खुले हैं।"]),
+    # Urdu full stop and question mark.
+    ("ur", "کابینہ نے اسکیم منظور کی۔ کیا یہ جلد شروع ہوگی؟ جی ہاں۔",
+     ["کابینہ نے اسکیم منظور کی۔", "کیا یہ جلد شروع ہوگی؟", "جی ہاں۔"]),
+    # Without a language, every language's punctuation counts.
+    (None, "योजना शुरू हुई। کابینہ نے منظور کی۔ Done.",
+     ["योजना शुरू हुई।", "کابینہ نے منظور کی۔", "Done."]),
+]
+
+# A release of several paragraphs, for the chunking and scene checks.
+RELEASE = "\n\n".join([
+    "The Union Cabinet has approved a new scheme. It covers all districts. Registration opens next month.",
+    "Shri. Modi said the scheme was a landmark. Rs. 5,000 crore has been set aside. Dr. Singh will lead it.",
+    "1. Farmers apply online. 2. Officers verify the forms. 3. Funds are paid directly.",
+])
+
+
+def check_sentences():
+    failures = 0
+    for lang_code, text, expected in SENTENCE_CASES:
+        sentences = parse_text_to_sentences(text, lang_code)
+        ok = sentences == expected
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} [{lang_code}] {text[:50]!r}" + ("" if ok else f"\n     got {sentences!r}"))
+    return failures
+
+
+def check_chunks():
+    """Text read in chunks must segment exactly like the whole string, wherever the chunks are cut."""
+    expected = list(iter_sentences(RELEASE))
+    failures = 0
+    for size in (1, 2, 3, 7, 64):
+        chunks = [RELEASE[i:i + size] for i in range(0, len(RELEASE), size)]
+        failures += list(iter_sentences(chunks)) != expected
+    expected_paragraphs = list(iter_paragraphs(RELEASE))
+    failures += list(iter_paragraphs([RELEASE[i:i + 5] for i in range(0, len(RELEASE), 5)])) != expected_paragraphs
+    print(f"{'OK  ' if not failures else 'FAIL'} chunked input segments like a string")
+    return failures
+
+
+def check_scenes():
+    """Scenes never cross a paragraph, end at anchors, fit the caption budget and are positioned by sentence."""
+    paragraphs = list(iter_paragraphs(RELEASE))
+    scenes = parse_text_to_scenes(RELEASE, "en")
+    problems = []
+    if [sentence for scene in scenes for sentence in scene.sentences] != [s for p in paragraphs for s in p]:
+        problems.append("scenes don't cover the sentences in order")
+    starts, start = {}, 0
+    for paragraph in paragraphs:
+        for index in range(len(paragraph)):
+            starts[start + index] = start
+        start += len(paragraph)
+    for scene in scenes:
+        paragraph_start = starts[scene.position]
+        end = scene.position + len(scene.sentences) - 1
+        if end not in starts or starts[end] != paragraph_start:
+            problems.append(f"scene at {scene.position} crosses a paragraph break")
+        if any(is_anchor(sentence) for sentence in scene.sentences[:-1]):
+            problems.append(f"scene at {scene.position} runs past an anchor")
+        if len(" ".join(scene.sentences)) > CAPTION_MAX_CHARS:
+            problems.append(f"scene at {scene.position} is over the caption budget")
+    # A long sentence is split into pieces that each fit and all keep its position.
+    long_sentence = ", ".join(["The scheme covers every district in the country"] * 8) + "."
+    pieces = [scene for scene in parse_text_to_scenes(f"First sentence. {long_sentence} Last sentence.", "en")
+              if "district" in " ".join(scene.sentences)]
+    if len(pieces) < 2 or any(scene.position != 1 or len(" ".join(scene.sentences)) > CAPTION_MAX_CHARS
+                              for scene in pieces):
+        problems.append("a long sentence's pieces don't fit or don't keep its position")
+    # Editing one sentence leaves the other paragraphs' scenes as they were.
+    edited = RELEASE.replace("It covers all districts.", "It covers all districts, as announced on Monday.")
+    after = parse_text_to_scenes(edited, "en")
+    if [scene for scene in scenes if scene.position >= len(paragraphs[0])] != \
+            [scene for scene in after if scene.position >= len(paragraphs[0])]:
+        problems.append("an edit moved scenes in other paragraphs")
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if not problems:
+        print(f"OK   {len(scenes)} scenes over {len(paragraphs)} paragraphs")
+    return len(problems)
+
+
+if __name__ == "__main__":
+    print("--- STARTING TEXT PROCESSING TEST ---")
+    failures = check_sentences() + check_chunks() + check_scenes()
+    print("--- ALL CASES PASSED ---" if not failures else f"--- {failures} FAILURE(S) ---")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,274 @@
+import itertools
+import math
+import re
+import zlib
+from collections import namedtuple
+
+# --- Language Dictionary ---
+LANGUAGES = {
+    "English": "en",
+    "Hindi (हिन्दी)": "hi",
+    "Bengali (বাংলা)": "bn",
+    "Tamil (தமிழ்)": "ta",
+    "Telugu (తెలుగు)": "te",
+    "Kannada (ಕನ್ನಡ)": "kn",
+    "Gujarati (ગુજરાતી)": "gu",
+    "Marathi ( मराठी)": "mr",
+    "Malayalam (മലയാളം)": "ml",
+    "Punjabi (ਪੰਜਾਬੀ)": "pa",
+    "Urdu (اردو)": "ur",
+    "Odia (ଓଡ଼IA)": "or",
+}
+
+# --- Segmentation Rules ---
+# Every language ends sentences with . ! ? and the ellipsis; Indic scripts
+# also use the danda (।) and double danda (॥), Urdu its own full stop and
+# question mark.
+TERMINATORS = ".!?…"
+DANDAS = "।॥"
+SCRIPT_TERMINATORS = {
+    "hi": DANDAS, "mr": DANDAS, "bn": DANDAS, "pa": DANDAS, "or": DANDAS,
+    "ta": DANDAS, "te": DANDAS, "kn": DANDAS, "gu": DANDAS, "ml": DANDAS,
+    "ur": "۔؟",
+}
+CLOSERS = "\"'”’»)]"
+OPENERS = "\"'“‘«(["
+CLAUSE_BREAKS = ",;:،؛"
+
+# Words written with a full stop that doesn't end the sentence, without
+# the stop and lower-cased. English ones turn up in releases in every language.
+ABBREVIATIONS = {
+    "en": {
+        "shri", "smt", "sh", "kum", "km", "dr", "mr", "mrs", "ms", "prof", "hon", "rs", "re", "no", "nos",
+        "govt", "dept", "lt", "col", "gen", "maj", "capt", "brig", "jr", "sr", "st", "vs", "viz", "approx",
+        "etc", "ltd", "pvt", "co", "inc", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept",
+        "oct", "nov", "dec", "fig", "vol", "art", "sec", "e.g", "i.e", "u.s", "u.k",
+    },
+    "hi": {"श्री", "श्रीमती", "सुश्री", "डॉ", "प्रो", "रु", "सं", "क्र", "पृ"},
+    "mr": {"श्री", "श्रीमती", "सौ", "डॉ", "प्रा", "रु", "क्र"},
+    "bn": {"শ্রী", "শ্রীমতী", "ডা", "ডঃ"},
+    "ta": {"திரு", "திருமதி", "டாக்", "ரூ", "எண்"},
+    "te": {"శ్రీ", "శ్రీమతి", "డా", "రూ"},
+    "kn": {"ಶ್ರೀ", "ಶ್ರೀಮತಿ", "ಡಾ", "ರೂ"},
+    "gu": {"શ્રી", "શ્રીમતી", "ડૉ", "પ્રો", "રૂ"},
+    "ml": {"ശ്രീ", "ശ്രീമതി", "ഡോ", "രൂ"},
+    "pa": {"ਸ੍ਰੀ", "ਸ਼੍ਰੀ", "ਸ੍ਰੀਮਤੀ", "ਡਾ", "ਰੁ"},
+    "or": {"ଶ୍ରୀ", "ଶ୍ରୀମତୀ", "ଡା"},
+    "ur": set(),
+}
+# Abbreviations that often close a sentence too; a capital letter after them starts a new one.
+FINAL_ABBREVIATIONS = {"etc", "ltd", "pvt", "co", "inc"}
+# Abbreviations only when a number follows ("No. 5", "Rs. 500"); "The answer is no." ends a sentence.
+NUMBER_ABBREVIATIONS = {"no", "nos", "rs", "re", "fig", "vol", "art", "sec"}
+INITIAL = re.compile(r"[A-Z]")
+LIST_MARKER = re.compile(r"\d{1,3}|[A-Za-z]|[ivxIVX]{1,4}")
+LEADING_SPACE = re.compile(r"\s*")
+
+# One scene of a script: the sentences (or pieces of a long sentence) it
+# speaks, in order, and its position, which picks its image and camera move:
+# the index of the sentence it starts in, so regrouping some sentences
+# doesn't move any other scene.
+SceneScript = namedtuple("SceneScript", ["sentences", "position"])
+
+# A compiled boundary pattern and the abbreviations of one language.
+SentenceRules = namedtuple("SentenceRules", ["boundary", "terminators", "abbreviations"])
+
+
+def _compile_rules(terminators, abbreviations):
+    boundary = re.compile(
+        rf"(?P<end>[{re.escape(terminators)}]+[{re.escape(CLOSERS)}]*)(?P<gap>\s+)"
+        r"|(?P<para>\n[^\S\n]*\n\s*)" # A blank line ends a sentence whatever precedes it
+    )
+    return SentenceRules(boundary, terminators + CLOSERS, frozenset(abbreviations))
+
+
+SENTENCE_RULES = {
+    code: _compile_rules(TERMINATORS + SCRIPT_TERMINATORS.get(code, ""), ABBREVIATIONS["en"] | ABBREVIATIONS[code])
+    for code in LANGUAGES.values()
+}
+# For text of unknown language, e.g. one release rendered in several languages.
+ANY_LANGUAGE = _compile_rules(TERMINATORS + "".join(sorted(set("".join(SCRIPT_TERMINATORS.values())))),
+                              set().union(*ABBREVIATIONS.values()))
+
+# --- Scene Balancing ---
+SPEECH_CHARS_PER_SECOND = 15 # Roughly how fast the TTS voices read, in characters
+SCENE_SECONDS = 4 # Short sentences are merged toward scenes this long
+CAPTION_MAX_CHARS = 160 # About three caption lines; longer sentences are split at clauses
+# About one sentence in this many is an anchor that always ends its scene,
+# chosen by its own content, so editing a sentence only regroups the few
+# sentences between the anchors around it.
+ANCHOR_EVERY = 3
+
+
+# --- Sentence Parsing ---
+
+def _ends_sentence(rules, text, start, match):
+    """Whether a boundary candidate really ends the sentence that began at `start`."""
+    if match.group("para") is not None or match.group("gap").count("\n") >= 2:
+        return True
+    end = match.group("end")
+    following = text[match.end():match.end() + 1]
+    if end.rstrip(CLOSERS) == ".":
+        # Only the word before the dot matters. Looking back no further than
+        # it keeps a long run of text without a sentence end linear.
+        token_end = match.start()
+        while token_end > start and text[token_end - 1].isspace():
+            token_end -= 1
+        token_start = token_end
+        while token_start > start and not text[token_start - 1].isspace():
+            token_start -= 1
+        token = text[token_start:token_end].lstrip(OPENERS)
+        key = token.lower()
+        if key in rules.abbreviations:
+            if key in FINAL_ABBREVIATIONS:
+                return following.isupper()
+            if key in NUMBER_ABBREVIATIONS:
+                return not following.isdigit()
+            return False
+        if INITIAL.fullmatch(token):
+            return False # "A. P. J. Abdul Kalam"
+        if LEADING_SPACE.match(text, start).end() == token_start and LIST_MARKER.fullmatch(token):
+            return False # A numbered point: "1. The scheme ..."
+    # "approx. five", "and so on... the scheme": a lower-case word carries the sentence on.
+    return not (end[0] in ".…" and following.islower())
+
+
+def _clean(sentence):
+    return " ".join(sentence.split())
+
+
+def _iter_segments(text, lang_code=None):
+    """Yields the sentences of `text`, and None at each paragraph break."""
+    rules = SENTENCE_RULES.get(lang_code, ANY_LANGUAGE)
+    chunks = [text] if isinstance(text, str) else text
+    pending, resume = "", 0
+    for final, chunk in itertools.chain(((False, chunk) for chunk in chunks), [(True, "")]):
+        pending += chunk
+        start = 0
+        while True:
+            match = rules.boundary.search(pending, resume)
+            if match is None:
+                # Rescan only the trailing punctuation and whitespace when the next chunk arrives.
+                resume = len(pending)
+                while resume > start and (pending[resume - 1].isspace() or pending[resume - 1] in rules.terminators):
+                    resume -= 1
+                break
+            if match.end() == len(pending) and not final:
+                resume = match.start() # What follows decides; wait for it
+                break
+            resume = match.end()
+            if _ends_sentence(rules, pending, start, match):
+                sentence = _clean(pending[start:match.end("end") if match.group("end") else match.start()])
+                if sentence:
+                    yield sentence
+                if match.group("para") is not None or match.group("gap").count("\n") >= 2:
+                    yield None
+                start = match.end()
+        pending = pending[start:]
+        resume -= start
+    sentence = _clean(pending)
+    if sentence:
+        yield sentence
+
+
+def iter_sentences(text, lang_code=None):
+    """Yields the sentences of `text` as they complete.
+
+    `text` is a string or an iterable of string chunks (such as an open
+    file), so multi-megabyte releases are segmented in one pass while only
+    the unfinished sentence is held in memory. Without a `lang_code` the
+    punctuation and abbreviations of every language are recognized.
+    """
+    return (sentence for sentence in _iter_segments(text, lang_code) if sentence is not None)
+
+
+def iter_paragraphs(text, lang_code=None):
+    """Yields the paragraphs of `text` (split at blank lines) as lists of sentences, like iter_sentences."""
+    paragraph = []
+    for sentence in _iter_segments(text, lang_code):
+        if sentence is not None:
+            paragraph.append(sentence)
+        elif paragraph:
+            yield paragraph
+            paragraph = []
+    if paragraph:
+        yield paragraph
+
+
+def split_long_sentence(sentence, max_chars):
+    """Cuts a sentence into near-equal pieces of at most `max_chars`, at clause breaks where possible."""
+    pieces = []
+    rest = sentence
+    while len(rest) > max_chars:
+        ideal = math.ceil(len(rest) / math.ceil(len(rest) / max_chars))
+        window = rest[:max_chars + 1]
+        clauses = [i + 1 for i, char in enumerate(window[:-1]) if char in CLAUSE_BREAKS and window[i + 1] == " "
+                   and i + 1 >= ideal // 2]
+        if clauses:
+            cut = min(clauses, key=lambda i: abs(i - ideal))
+        else:
+            before, after = window.rfind(" ", 0, ideal + 1), window.find(" ", ideal)
+            spaces = [i for i in (before, after) if i > 0]
+            cut = min(spaces, key=lambda i: abs(i - ideal)) if spaces else max_chars
+        pieces.append(rest[:cut].strip())
+        rest = rest[cut:].strip()
+    if rest:
+        pieces.append(rest)
+    return pieces
+
+
+def is_anchor(sentence):
+    """Whether a sentence always ends its scene; decided by its text alone (crc32 is the same in every process)."""
+    return zlib.crc32(sentence.encode("utf-8")) % ANCHOR_EVERY == 0
+
+
+def balance_sentences(sentences, target_chars=None, max_chars=None):
+    """Yields SceneScripts: long sentences split down to `max_chars`, short neighbours merged.
+
+    A scene grows by whole sentences while it is shorter than `target_chars`
+    and still fits in `max_chars`, but it always ends at an anchor sentence
+    (see is_anchor). Grouping is therefore decided afresh after every
+    anchor, and an edit can only regroup the sentences between the anchors
+    around it. Either limit can be None to turn that half off. A scene's
+    position is the index in `sentences` of the sentence it starts in.
+    """
+    scene, length, position = [], 0, 0
+    for index, sentence in enumerate(sentences):
+        for piece in split_long_sentence(sentence, max_chars) if max_chars else [sentence]:
+            if (scene and target_chars and length < target_chars
+                    and (not max_chars or length + 1 + len(piece) <= max_chars)):
+                scene.append(piece)
+                length += 1 + len(piece)
+            else:
+                if scene:
+                    yield SceneScript(tuple(scene), position)
+                scene, length, position = [piece], len(piece), index
+            if is_anchor(piece):
+                yield SceneScript(tuple(scene), position)
+                scene, length = [], 0
+    if scene:
+        yield SceneScript(tuple(scene), position)
+
+
+def parse_text_to_sentences(text, lang_code=None):
+    """Splits text into sentences, following the punctuation of `lang_code` (any language if None)."""
+    return list(iter_sentences(text, lang_code))
+
+
+def parse_text_to_scenes(text, lang_code=None, scene_seconds=SCENE_SECONDS, max_chars=CAPTION_MAX_CHARS):
+    """Splits text into the video's scenes, as a list of SceneScript.
+
+    Sentences are balanced so each scene lasts about `scene_seconds` and no
+    caption is longer than `max_chars` (None turns either limit off). Scenes
+    never cross a paragraph break, and merging restarts at anchor sentences,
+    so editing one sentence changes only the scenes next to it. Each
+    sentence keeps its own audio clip; a scene plays its clips in turn.
+    """
+    target = round(scene_seconds * SPEECH_CHARS_PER_SECOND) if scene_seconds else None
+    scenes, start = [], 0
+    for paragraph in iter_paragraphs(text, lang_code):
+        # Positions count whole sentences, so however an edited sentence is split, no other scene moves.
+        scenes.extend(scene._replace(position=start + scene.position)
+                      for scene in balance_sentences(paragraph, target, max_chars))
+        start += len(paragraph)
+    return scenes
@@ -0,0 +1,150 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import wave
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from media import audio_duration
+from storage import atomic_write
+
+DEFAULT_CACHE_DIR = os.environ.get("PRESSPLAY_TTS_CACHE", os.path.join(".cache", "tts"))
+DEFAULT_MAX_WORKERS = 4
+LOCK_STRIPES = 64 # Keys share this many locks, so the lock table never grows
+
+# One synthesized sentence: the text, its cached audio file and its real length.
+SentenceAudio = namedtuple("SentenceAudio", ["text", "path", "duration"])
+
+
+# --- Backends ---
+# A backend is any object with a `name`, a file extension `ext` and a
+# `synthesize(text, lang_code, slow)` method returning encoded audio bytes.
+
+class GTTSBackend:
+    """Google Text-to-Speech, returning MP3 bytes."""
+    name = "gtts"
+    ext = ".mp3"
+
+    def synthesize(self, text, lang_code, slow=False):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang_code, slow=slow).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class StubBackend:
+    """Offline, deterministic stand-in for gTTS: silence whose length follows the text."""
+    name = "stub"
+    ext = ".wav"
+
+    def __init__(self, seconds_per_char=0.06, min_seconds=0.5, sample_rate=16000):
+        self.seconds_per_char = seconds_per_char
+        self.min_seconds = min_seconds
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text, lang_code, slow=False):
+        seconds = max(self.min_seconds, len(text) * self.seconds_per_char)
+        if slow:
+            seconds *= 1.5
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.sample_rate)
+            w.writeframes(b"\x00\x00" * int(seconds * self.sample_rate))
+        return buffer.getvalue()
+
+
+# --- Cache ---
+
+class AudioCache:
+    """On-disk cache of synthesized clips, keyed by a hash of (text, lang_code, slow)."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._locks_guard = threading.Lock()
+
+    @staticmethod
+    def key(text, lang_code, slow):
+        payload = json.dumps([text, lang_code, bool(slow)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, backend, key):
+        # Each backend gets its own folder so stub audio never leaks into real renders.
+        folder = os.path.join(self.cache_dir, backend.name)
+        return os.path.join(folder, key + backend.ext), os.path.join(folder, key + ".json")
+
+    def lock_for(self, key):
+        """Returns the lock for a key, so concurrent jobs don't synthesize the same clip twice.
+
+        Locks are striped by key: two different sentences may occasionally
+        wait on each other, but the same sentence always gets the same lock.
+        """
+        return self._locks[int(key[:8], 16) % len(self._locks)]
+
+    def get(self, backend, text, lang_code, slow):
+        clip = self._load(backend, text, lang_code, slow)
+        with self._locks_guard:
+            if clip:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return clip
+
+    def _load(self, backend, text, lang_code, slow):
+        audio_path, meta_path = self._paths(backend, self.key(text, lang_code, slow))
+        try:
+            with open(meta_path) as f:
+                duration = json.load(f)["duration"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if not os.path.exists(audio_path):
+            return None
+        return SentenceAudio(text, audio_path, duration)
+
+    def put(self, backend, text, lang_code, slow, data):
+        audio_path, meta_path = self._paths(backend, self.key(text, lang_code, slow))
+        atomic_write(audio_path, data)
+        duration = audio_duration(audio_path)
+        atomic_write(meta_path, json.dumps({"duration": duration}).encode("utf-8"))
+        return SentenceAudio(text, audio_path, duration)
+
+
+# --- Synthesis ---
+
+# Shared by every job in the process.
+audio_cache = AudioCache()
+
+
+def synthesize_sentence(text, lang_code, slow=False, backend=None, cache=None):
+    """Returns the SentenceAudio for one sentence, synthesizing it only on a cache miss."""
+    backend = backend or GTTSBackend()
+    cache = cache or audio_cache
+    with cache.lock_for(cache.key(text, lang_code, slow)):
+        cached = cache.get(backend, text, lang_code, slow)
+        if cached:
+            return cached
+        return cache.put(backend, text, lang_code, slow, backend.synthesize(text, lang_code, slow))
+
+
+def synthesize_sentences(sentences, lang_code, slow=False, backend=None, cache=None,
+                         max_workers=DEFAULT_MAX_WORKERS):
+    """Synthesizes every sentence through a bounded thread pool, in input order.
+
+    Repeated sentences are only synthesized once, and clips already on disk
+    from earlier renders are reused without calling the backend.
+    """
+    backend = backend or GTTSBackend()
+    cache = cache or audio_cache
+    unique = list(dict.fromkeys(sentences))
+    if not unique:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+        clips = pool.map(lambda s: synthesize_sentence(s, lang_code, slow, backend, cache), unique)
+        by_text = dict(zip(unique, clips))
+    return [by_text[s] for s in sentences]